@@ -0,0 +1,128 @@
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import EngagementRollup, EphemeralReading, RollupWatermark, Vote
+
+WATERMARK_NAME = 'engagement'
+
+
+def bucket_floor(value, granularity):
+    value = value.astimezone(dt_timezone.utc)
+    if granularity == EngagementRollup.HOUR:
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _count_by_bucket(queryset, date_field, granularity):
+    return (
+        queryset.annotate(bucket=Trunc(date_field, granularity, tzinfo=dt_timezone.utc))
+        .order_by()
+        .values('bucket', 'departure_page', 'departure_page__ending_type', 'departure_page__tone')
+        .annotate(count=Count('pk'))
+    )
+
+
+def rebuild_buckets(granularity, start, end):
+    """
+    Recompute every bucket of the given granularity overlapping [start, end]
+    from the raw readings and votes. Buckets are replaced wholesale, which
+    makes reruns over the same range idempotent.
+    """
+    start = bucket_floor(start, granularity)
+    readings = EphemeralReading.objects.filter(
+        has_been_viewed=True, view_date__gte=start, view_date__lte=end
+    )
+    votes = Vote.objects.filter(created_at__gte=start, created_at__lte=end)
+
+    rows = {}
+    for counts, metric in (
+        (_count_by_bucket(readings, 'view_date', granularity), 'views'),
+        (_count_by_bucket(votes, 'created_at', granularity), 'votes'),
+    ):
+        for entry in counts:
+            key = (entry['bucket'], entry['departure_page'])
+            if key not in rows:
+                rows[key] = EngagementRollup(
+                    granularity=granularity,
+                    bucket_start=entry['bucket'],
+                    departure_page_id=entry['departure_page'],
+                    ending_type=entry['departure_page__ending_type'],
+                    tone=entry['departure_page__tone'],
+                )
+            setattr(rows[key], metric, entry['count'])
+
+    EngagementRollup.objects.filter(
+        granularity=granularity, bucket_start__gte=start, bucket_start__lte=end
+    ).delete()
+    EngagementRollup.objects.bulk_create(rows.values(), batch_size=1000)
+    return len(rows)
+
+
+def first_event():
+    """When the first reading or vote was recorded, None if there is none yet."""
+    firsts = [
+        EphemeralReading.objects.filter(has_been_viewed=True).aggregate(first=Min('view_date'))['first'],
+        Vote.objects.aggregate(first=Min('created_at'))['first'],
+    ]
+    firsts = [first for first in firsts if first is not None]
+    return min(firsts) if firsts else None
+
+
+def rollup_windows(since, until, window):
+    """Split [since, until] into windows ending on day boundaries, so no daily bucket straddles two."""
+    start = since
+    while start < until:
+        end = min(bucket_floor(start, EngagementRollup.DAY) + window, until)
+        yield start, end
+        start = end
+
+
+def run_rollup(backfill=False, until=None, window=timedelta(days=1)):
+    """
+    Roll readings and votes recorded since the last run into hourly and daily
+    buckets, then advance the high-water mark. With backfill, start over from
+    the first recorded event. The range is processed one window (a whole
+    number of days) at a time, each in its own transaction that moves the
+    mark forward, so a long backfill holds no lock for long and resumes
+    where it stopped.
+
+    The mark follows event time: rows stamped just before they commit are
+    left for the next run by stopping ROLLUP_MARGIN_SECONDS short of now,
+    and rows written with an older event time move it back
+    (RollupWatermark.rewind_for).
+    """
+    until = until or timezone.now() - timedelta(seconds=getattr(settings, 'ROLLUP_MARGIN_SECONDS', 60))
+    watermark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK_NAME)
+    if backfill or watermark.value is None:
+        since = first_event() or until
+    else:
+        since = watermark.value
+
+    written = {granularity: 0 for granularity, _ in EngagementRollup.GRANULARITY_CHOICES}
+    for start, end in rollup_windows(since, until, window):
+        with transaction.atomic():
+            watermark = RollupWatermark.objects.select_for_update().get(name=WATERMARK_NAME)
+            for granularity in written:
+                written[granularity] += rebuild_buckets(granularity, start, end)
+            watermark.value = end
+            watermark.save(update_fields=['value', 'updated_at'])
+
+    if since >= until:
+        RollupWatermark.objects.filter(name=WATERMARK_NAME).update(value=until, updated_at=timezone.now())
+    return since, until, written
+
+
+def engagement_series(queryset, granularity, group_by=None):
+    """Sum views and votes per bucket, optionally split by ending_type or tone."""
+    columns = ['bucket_start'] + ([group_by] if group_by else [])
+    return (
+        queryset.filter(granularity=granularity)
+        .values(*columns)
+        .annotate(views=Sum('views'), votes=Sum('votes'))
+        .order_by(*columns)
+    )
@@ -0,0 +1,24 @@
+import zlib
+
+from django.utils.http import parse_etags
+
+
+def weak_etag(*parts):
+    """Weak ETag built from cheap identifying values, never from the body."""
+    return 'W/"%s"' % '-'.join(str(part) for part in parts)
+
+
+def row_digest(*values):
+    """Short checksum of already loaded values, for ETags of rows without a version."""
+    return format(zlib.crc32(repr(values).encode('utf-8')), 'x')
+
+
+def etag_matches(request, etag):
+    """Weak comparison of etag against the request's If-None-Match."""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header or not etag:
+        return False
+    if header.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(candidate.removeprefix('W/') == opaque for candidate in parse_etags(header))
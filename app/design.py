@@ -0,0 +1,71 @@
+from django.conf import settings
+
+from .fields import encode_json
+
+DESIGN_SCHEMA_VERSION = 1
+
+# Upgraders from one design_data schema version to the next, keyed by the
+# version they upgrade from.
+DESIGN_UPGRADES = {}
+
+
+def template_defaults(template_id):
+    """Shared design defaults of a template, from settings.DESIGN_TEMPLATES."""
+    return getattr(settings, 'DESIGN_TEMPLATES', {}).get(template_id)
+
+
+def validate_design(design_data, template_id):
+    """Return a list of error messages, empty when design_data is acceptable."""
+    if not isinstance(design_data, dict):
+        return ["Design data must be a JSON object."]
+
+    errors = []
+    max_bytes = getattr(settings, 'DESIGN_DATA_MAX_BYTES', 64 * 1024)
+    size = len(encode_json(design_data))
+    if size > max_bytes:
+        errors.append(f"Design data is {size} bytes, the limit is {max_bytes}.")
+
+    defaults = template_defaults(template_id)
+    if defaults is not None:
+        for key, value in design_data.items():
+            if key not in defaults:
+                errors.append(f"'{key}' is not a design setting of template '{template_id}'.")
+            elif defaults[key] is not None and value is not None and not isinstance(value, type(defaults[key])):
+                errors.append(f"'{key}' must be of type {type(defaults[key]).__name__}.")
+    return errors
+
+
+def design_overrides(design_data, template_id):
+    """Keep only the settings that differ from the template defaults."""
+    defaults = template_defaults(template_id) or {}
+    return {key: value for key, value in design_data.items() if key not in defaults or defaults[key] != value}
+
+
+def carry_design(design_data, from_template, to_template):
+    """
+    A page's full design under from_template, for use with to_template:
+    settings the page overrides are all kept, and validated against the new
+    template, but defaults of the previous template that the new one does
+    not have are dropped.
+    """
+    previous = template_defaults(from_template) or {}
+    target = template_defaults(to_template)
+    if target is None:
+        return design_data
+    return {
+        key: value for key, value in design_data.items()
+        if key in target or key not in previous or previous[key] != value
+    }
+
+
+def upgrade_design(design_data, version):
+    while version < DESIGN_SCHEMA_VERSION:
+        design_data = DESIGN_UPGRADES[version](design_data)
+        version += 1
+    return design_data
+
+
+def effective_design(page):
+    """Template defaults with the page's own overrides applied."""
+    overrides = upgrade_design(page.design_data or {}, page.design_version)
+    return {**(template_defaults(page.template_id) or {}), **overrides}
@@ -0,0 +1,56 @@
+import json
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+COMPRESSED_MAGIC = b'\x1fz'
+
+
+def encode_json(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class CompressedJSONField(models.BinaryField):
+    """
+    JSON stored as compact UTF-8 bytes, zlib-compressed once it grows past
+    DESIGN_DATA_COMPRESS_MIN_BYTES. Plain JSON text (as left by the former
+    JSONField column) is still read back as is.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        raw = encode_json(value)
+        if len(raw) >= getattr(settings, 'DESIGN_DATA_COMPRESS_MIN_BYTES', 1024):
+            compressed = COMPRESSED_MAGIC + zlib.compress(raw, 6)
+            if len(compressed) < len(raw):
+                return compressed
+        return raw
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        return super().get_db_prep_value(value, connection, prepared=True)
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, (dict, list)):
+            return value
+        if isinstance(value, memoryview):
+            value = value.tobytes()
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        if value.startswith(COMPRESSED_MAGIC):
+            value = zlib.decompress(value[len(COMPRESSED_MAGIC):])
+        return json.loads(value) if value else None
+
+    def value_to_string(self, obj):
+        return encode_json(self.value_from_object(obj)).decode('utf-8')
@@ -0,0 +1,149 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed message stays reserved before another worker may retry it.
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def delivery_connection():
+    return get_connection(
+        getattr(settings, 'EMAIL_DELIVERY_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+    )
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """
+    Email backend that only stores messages in the OutboundEmail table, so
+    sending mail never waits on SMTP. The send_queued_mail command delivers
+    them. Messages with attachments are not queued but sent right away.
+    """
+
+    def send_messages(self, email_messages):
+        queued = []
+        immediate = []
+        for message in email_messages:
+            if message.attachments:
+                immediate.append(message)
+                continue
+            queued.append(OutboundEmail(
+                subject=message.subject,
+                body=message.body,
+                content_subtype=message.content_subtype,
+                from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+                to=list(message.to),
+                cc=list(message.cc),
+                bcc=list(message.bcc),
+                reply_to=list(message.reply_to),
+                headers=dict(message.extra_headers),
+                alternatives=[list(alternative) for alternative in getattr(message, 'alternatives', [])],
+            ))
+        OutboundEmail.objects.bulk_create(queued)
+
+        sent = len(queued)
+        if immediate:
+            sent += delivery_connection().send_messages(immediate) or 0
+        return sent
+
+
+def build_message(email, connection):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.to,
+        cc=email.cc,
+        bcc=email.bcc,
+        reply_to=email.reply_to,
+        headers=email.headers,
+        connection=connection,
+    )
+    message.content_subtype = email.content_subtype
+    for content, mimetype in email.alternatives:
+        message.attach_alternative(content, mimetype)
+    return message
+
+
+def claim_batch(batch_size):
+    """Reserve up to batch_size due messages for this worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[OutboundEmail.QUEUED, OutboundEmail.SENDING], next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in due]).update(
+            status=OutboundEmail.SENDING, next_attempt_at=now + CLAIM_TIMEOUT
+        )
+    return due
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 6 * 60 * 60))
+
+
+def deliver_outbox(batch_size=50):
+    """
+    Send one batch of queued mail over a single connection. Failed messages
+    are retried with exponential backoff until EMAIL_OUTBOX_MAX_ATTEMPTS.
+    Returns (sent, failed).
+    """
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    sent = failed = 0
+    connection = delivery_connection()
+    try:
+        for email in batch:
+            email.attempts += 1
+            try:
+                # Opens the connection on first use, or again after an error.
+                connection.open()
+                build_message(email, connection).send()
+            except Exception as e:
+                logger.warning("Sending email %s failed (attempt %s): %s", email.pk, email.attempts, e)
+                failed += 1
+                email.last_error = str(e)
+                if email.attempts >= max_attempts:
+                    email.status = OutboundEmail.FAILED
+                else:
+                    email.status = OutboundEmail.QUEUED
+                    email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                connection.close()
+            else:
+                sent += 1
+                email.status = OutboundEmail.SENT
+                email.sent_at = timezone.now()
+                email.last_error = ''
+                # Confirmation and password reset links are not kept once delivered.
+                email.body = ''
+                email.alternatives = []
+            email.save(update_fields=[
+                'attempts', 'status', 'next_attempt_at', 'sent_at', 'last_error', 'body', 'alternatives'
+            ])
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def prune_outbox(retention=None):
+    """Delete sent and failed messages older than EMAIL_OUTBOX_RETENTION_DAYS. Returns how many."""
+    if retention is None:
+        retention = timedelta(days=getattr(settings, 'EMAIL_OUTBOX_RETENTION_DAYS', 7))
+    deleted, _ = OutboundEmail.objects.filter(
+        status__in=[OutboundEmail.SENT, OutboundEmail.FAILED], created_at__lt=timezone.now() - retention
+    ).delete()
+    return deleted
@@ -0,0 +1,55 @@
+import gzip
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.middleware import brotli
+
+
+def sample_payload(target_bytes):
+    """A page list shaped like DeparturePageListView's output, about target_bytes long."""
+    rows = []
+    size = 2
+    while size < target_bytes:
+        row = {
+            'id': str(uuid.uuid4()),
+            'title': f"Goodbye to everything, chapter {len(rows)}",
+            'votes_count': len(rows) * 7 % 131,
+            'tone': ['sadness', 'poetic', 'hilarious', 'acceptance'][len(rows) % 4],
+        }
+        rows.append(row)
+        size += len(json.dumps(row)) + 2
+    return json.dumps(rows).encode('utf-8')
+
+
+class Command(BaseCommand):
+    help = "Report bytes saved and CPU time per response size for gzip and brotli compression."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='512,2048,16384,131072,1048576', help="Comma separated payload sizes in bytes.")
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        codecs = [('gzip', lambda data: gzip.compress(data, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0))]
+        if brotli is not None:
+            codecs.append(('br', lambda data: brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)))
+        else:
+            self.stderr.write("brotli is not installed, only gzip is measured.")
+
+        self.stdout.write(f"{'size':>10} {'codec':>6} {'output':>10} {'saved':>7} {'cpu/resp':>12}")
+        for size in (int(value) for value in options['sizes'].split(',')):
+            payload = sample_payload(size)
+            for name, compress in codecs:
+                started = time.process_time()
+                for _ in range(options['iterations']):
+                    compressed = compress(payload)
+                cpu = (time.process_time() - started) / options['iterations']
+                saved = 1 - len(compressed) / len(payload)
+                self.stdout.write(
+                    f"{len(payload):>10} {name:>6} {len(compressed):>10} {saved:>6.0%} {cpu * 1e6:>9.0f} us"
+                )
+            if len(payload) < settings.COMPRESSION_MIN_BYTES:
+                self.stdout.write(f"{'':>10} (below COMPRESSION_MIN_BYTES, sent uncompressed)")
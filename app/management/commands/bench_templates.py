@@ -0,0 +1,46 @@
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template import Context, Engine
+from django.test import RequestFactory, override_settings
+
+from app.templating import CSRF_PLACEHOLDER, render_cached
+
+
+class Command(BaseCommand):
+    help = "Measure per-request render time of the email confirmation pages with and without template caching."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000)
+        parser.add_argument('--template', default='auth/email_confirm.html')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        name = options['template']
+        confirmation = SimpleNamespace(email_address=SimpleNamespace(email='someone@example.com'))
+        context = {'confirmation': confirmation, 'confirm_url': '/api/auth/registration/account-confirm-email/key/', 'csrf_token': CSRF_PLACEHOLDER}
+        request = RequestFactory().get(context['confirm_url'])
+        options = settings.TEMPLATES[0]
+
+        def timed(render):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                render()
+            return (time.perf_counter() - started) / iterations * 1e6
+
+        uncached = Engine(dirs=options['DIRS'], loaders=settings.TEMPLATE_LOADERS)
+        cached = Engine(dirs=options['DIRS'], loaders=[('django.template.loaders.cached.Loader', settings.TEMPLATE_LOADERS)])
+
+        results = [
+            ("parse + render", timed(lambda: uncached.get_template(name).render(Context(context)))),
+            ("cached loader", timed(lambda: cached.get_template(name).render(Context(context)))),
+        ]
+        # Full view path: response object and CSRF token included.
+        for label, timeout in (("view, no cache", 0), ("view, fragment", 300)):
+            with override_settings(TEMPLATE_FRAGMENT_CACHE_TIMEOUT=timeout):
+                results.append((label, timed(lambda: render_cached(request, name, context, key='bench'))))
+
+        for label, micros in results:
+            self.stdout.write(f"{label:<16} {micros:9.1f} us/request")
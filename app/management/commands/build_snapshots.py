@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.snapshots import refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = "Regenerate share snapshots of edited public pages and remove those of pages no longer public."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for edited pages instead of exiting once done.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            built, withdrawn = refresh_snapshots(batch_size=options['batch_size'])
+            if built or withdrawn:
+                self.stdout.write(f"Built {built}, withdrew {withdrawn}")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from app.models import DeparturePage
+from app.transfer import RELATED_EXPORTS, export_ndjson
+
+
+class Command(BaseCommand):
+    help = "Stream departure pages, optionally with readings and votes, as NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help="File to write to, '-' for stdout.")
+        parser.add_argument(
+            '--include', action='append', default=[], choices=sorted(RELATED_EXPORTS),
+            help="Related rows to export along with the pages. Repeatable."
+        )
+        parser.add_argument('--user', help="Only export pages owned by this user id.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        pages = DeparturePage.objects.all()
+        if options['user']:
+            pages = pages.filter(user_id=options['user'])
+
+        lines = export_ndjson(pages, include=options['include'], chunk_size=options['chunk_size'])
+        if options['output'] == '-':
+            sys.stdout.writelines(lines)
+            return
+
+        count = 0
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            for line in lines:
+                output.write(line)
+                count += 1
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} rows to {options['output']}"))
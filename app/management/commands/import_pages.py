@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import CustomUser
+from app.transfer import NDJSONImporter, TransferError
+
+
+class Command(BaseCommand):
+    help = "Import departure pages, readings and votes from NDJSON produced by export_pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="NDJSON file to read, '-' for stdin.")
+        parser.add_argument('--owner', help="Assign every imported page to this user id.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help="Skip rows whose id already exists instead of failing."
+        )
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            try:
+                owner = CustomUser.objects.get(pk=options['owner'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"User {options['owner']} does not exist")
+
+        importer = NDJSONImporter(
+            owner=owner,
+            batch_size=options['batch_size'],
+            ignore_conflicts=options['ignore_conflicts'],
+        )
+
+        def progress(importer):
+            self.stderr.write(f"{importer.total} rows, {importer.rows_per_second:.0f} rows/sec")
+
+        source = sys.stdin if options['input'] == '-' else open(options['input'], encoding='utf-8')
+        try:
+            counts = importer.run(source, progress=progress)
+        except TransferError as e:
+            raise CommandError(f"{e}. Rows before the failing batch were committed ({importer.total}).")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        summary = ", ".join(f"{count} {record_type}s" for record_type, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary} at {importer.rows_per_second:.0f} rows/sec"
+        ))
@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter so nothing is imported yet: boots Django the way
+# a WSGI worker does, timing each AppConfig.ready(), then loads the URLconf
+# (and with it every view module).
+PROBE = """
+import json, os, sys, time
+from django.apps import config
+
+create = config.AppConfig.create.__func__
+timings = {}
+
+def timed_create(cls, entry):
+    app_config = create(cls, entry)
+    ready = app_config.ready
+    def timed_ready():
+        started = time.perf_counter()
+        ready()
+        timings[app_config.name] = time.perf_counter() - started
+    app_config.ready = timed_ready
+    return app_config
+
+config.AppConfig.create = classmethod(timed_create)
+
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+setup = time.perf_counter() - started
+from django.urls import get_resolver
+get_resolver().url_patterns
+total = time.perf_counter() - started
+sys.stdout.write(json.dumps({'setup': setup, 'total': total, 'ready': timings}))
+"""
+
+
+def parse_importtime(stderr):
+    """Yield (module, self_us, cumulative_us, depth) from -X importtime output."""
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        yield name.strip(), int(self_us), int(cumulative_us), depth
+
+
+class Command(BaseCommand):
+    help = "Report where worker boot time goes: per-module import time and time spent in AppConfig.ready()."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help="Number of modules to list.")
+        parser.add_argument(
+            '--by', choices=['cumulative', 'self'], default='cumulative',
+            help="Rank modules by time including their imports, or by their own time only."
+        )
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE],
+            capture_output=True, text=True, env=env, cwd=os.getcwd(),
+        )
+        if result.returncode:
+            self.stderr.write(result.stderr[-2000:])
+            return
+
+        probe = json.loads(result.stdout)
+        modules = list(parse_importtime(result.stderr))
+        index = 1 if options['by'] == 'self' else 2
+        if options['by'] == 'cumulative':
+            # Top-level imports only, otherwise parents and children repeat each other.
+            candidates = [module for module in modules if module[3] == 0]
+        else:
+            candidates = modules
+
+        self.stdout.write(f"Django setup: {probe['setup'] * 1000:.1f} ms, with URLconf: {probe['total'] * 1000:.1f} ms")
+        self.stdout.write(f"Modules imported: {len(modules)}\n")
+        self.stdout.write(f"Slowest imports ({options['by']}):")
+        for module in sorted(candidates, key=lambda m: m[index], reverse=True)[:options['top']]:
+            self.stdout.write(f"  {module[index] / 1000:8.1f} ms  {module[0]}")
+
+        self.stdout.write("\nAppConfig.ready():")
+        for name, seconds in sorted(probe['ready'].items(), key=lambda item: item[1], reverse=True):
+            self.stdout.write(f"  {seconds * 1000:8.1f} ms  {name}")
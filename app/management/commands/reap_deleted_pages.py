@@ -0,0 +1,34 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from app.reaper import reap_deleted_pages, reaper_backlog
+
+
+class Command(BaseCommand):
+    help = "Hard-delete soft-deleted departure pages with their readings, votes and image, in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows deleted per transaction.")
+        parser.add_argument('--max-pages', type=int, help="Stop after this many pages.")
+        parser.add_argument('--grace-seconds', type=int, default=0, help="Only reap pages deleted at least this long ago.")
+        parser.add_argument('--loop', action='store_true', help="Keep running, polling for newly deleted pages.")
+        parser.add_argument('--interval', type=float, default=30.0, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            totals = reap_deleted_pages(
+                batch_size=options['batch_size'],
+                max_pages=options['max_pages'],
+                grace=timedelta(seconds=options['grace_seconds']),
+            )
+            if totals['pages']:
+                summary = ", ".join(f"{count} {name}" for name, count in totals.items())
+                self.stdout.write(f"Reaped {summary}")
+            if not options['loop']:
+                backlog = reaper_backlog()
+                self.stdout.write(f"Backlog: {backlog['pending_pages']} pages, lag {backlog['lag_seconds']:.0f}s")
+                break
+            if not totals['pages']:
+                time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.analytics import run_rollup
+
+
+class Command(BaseCommand):
+    help = "Roll page readings and votes into hourly and daily engagement buckets."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help="Rebuild every bucket from the first recorded event instead of the last high-water mark."
+        )
+        parser.add_argument(
+            '--window-days', type=int, default=1,
+            help="Days rolled up per transaction."
+        )
+
+    def handle(self, *args, **options):
+        if options['window_days'] < 1:
+            raise CommandError("--window-days must be at least 1")
+        started = time.monotonic()
+        since, until, written = run_rollup(backfill=options['backfill'], window=timedelta(days=options['window_days']))
+        elapsed = time.monotonic() - started
+        buckets = ", ".join(f"{count} {granularity}" for granularity, count in written.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {since:%Y-%m-%d %H:%M} -> {until:%Y-%m-%d %H:%M}: {buckets} buckets in {elapsed:.2f}s"
+        ))
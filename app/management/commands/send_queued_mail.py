@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.mail import deliver_outbox, prune_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver mail queued in the outbox, in batches over a single SMTP connection, and prune old messages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help="Keep polling the outbox instead of exiting once it is empty.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = deliver_outbox(batch_size=options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+                continue
+            pruned = prune_outbox()
+            if pruned:
+                self.stdout.write(f"Pruned {pruned} delivered or failed messages")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
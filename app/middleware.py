@@ -0,0 +1,129 @@
+import gzip
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from .conditional import etag_matches
+from .profiling import RequestTrace, build_capture, config as profiling_config, get_sampler, save_capture
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered.
+    brotli = None
+
+accept_encoding_re = _lazy_re_compile(r'\s*([\w*-]+)\s*(?:;\s*q=([0-9.]+))?')
+
+
+def accepted_encodings(header):
+    encodings = {}
+    for part in header.split(','):
+        match = accept_encoding_re.match(part)
+        if match:
+            encodings[match.group(1).lower()] = float(match.group(2) or 1)
+    return {name for name, quality in encodings.items() if quality > 0}
+
+
+class ConditionalETagMiddleware:
+    """
+    Answer GET/HEAD with 304 when the response carries an ETag matching
+    If-None-Match. Unlike Django's ConditionalGetMiddleware it never hashes
+    the body to make one up: views set cheap ETags themselves.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method in ('GET', 'HEAD') and response.status_code == 200 and etag_matches(request, response.get('ETag')):
+            not_modified = HttpResponseNotModified()
+            for header in ('ETag', 'Cache-Control', 'Vary', 'Last-Modified', 'Expires'):
+                if header in response:
+                    not_modified[header] = response[header]
+            return not_modified
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Brotli or gzip compression for responses of at least
+    COMPRESSION_MIN_BYTES. Streaming responses (NDJSON exports, server-sent
+    events) are passed through untouched.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_bytes = getattr(settings, 'COMPRESSION_MIN_BYTES', 1024)
+        self.gzip_level = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or response.get('Content-Type', '').startswith('text/event-stream')
+            or len(response.content) < self.min_bytes
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding, compressed = 'br', brotli.compress(response.content, quality=self.brotli_quality)
+        elif 'gzip' in accepted:
+            encoding, compressed = 'gzip', gzip.compress(response.content, compresslevel=self.gzip_level, mtime=0)
+        else:
+            return response
+
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Keep the SQL trace and stack samples of requests slower than
+    PROFILING_SLOW_REQUEST_MS, and of the requests picked by the staff
+    profiling toggle whatever their duration (see app.profiling). With both
+    off a request costs one lookup of the locally cached toggle.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'PROFILING_SLOW_REQUEST_MS', 0)
+
+    def __call__(self, request):
+        if not self.slow_ms and not profiling_config.get():
+            return self.get_response(request)
+
+        trace = request.profiling_trace = RequestTrace()
+        sampler = get_sampler()
+        sampler.add(trace)
+        try:
+            with connection.execute_wrapper(trace):
+                response = self.get_response(request)
+        finally:
+            sampler.remove(trace)
+
+        if trace.profiled:
+            save_capture(build_capture(request, response, trace, 'sampled'))
+        elif self.slow_ms and trace.elapsed() * 1000 >= self.slow_ms:
+            save_capture(build_capture(request, response, trace, 'slow'))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        trace = getattr(request, 'profiling_trace', None)
+        if trace is not None and profiling_config.selects(request.resolver_match.url_name):
+            trace.profiled = True
+            get_sampler().wakeup.set()
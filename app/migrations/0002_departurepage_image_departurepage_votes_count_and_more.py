@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-19 13:57
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='departurepage',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to='departure_images/'),
+        ),
+        migrations.AddField(
+            model_name='departurepage',
+            name='votes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='departurepage',
+            name='tone',
+            field=models.CharField(choices=[('liberating_joy', 'Liberating Joy'), ('sadness', 'Sadness'), ('disgust', 'Disgust'), ('explosive_anger', 'Explosive Anger'), ('detached_irony', 'Detached Irony'), ('hilarious', 'Hilarious'), ('poetic', 'Poetic'), ('existential_void', 'Existential Void'), ('acceptance', 'Acceptance'), ('confused', 'Confused')], default='sadness', max_length=25),
+        ),
+        migrations.CreateModel(
+            name='Vote',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('departure_page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='app.departurepage')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('departure_page', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-19 13:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_departurepage_image_departurepage_votes_count_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='ephemeralreading',
+            name='view_date',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='vote',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='EngagementRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('ending_type', models.CharField(choices=[('breakup', 'Romantic Breakup'), ('work', 'Work Resignation/Burnout'), ('project', 'Project Ending'), ('community', 'Community Departure'), ('other', 'Other')], max_length=20)),
+                ('tone', models.CharField(choices=[('liberating_joy', 'Liberating Joy'), ('sadness', 'Sadness'), ('disgust', 'Disgust'), ('explosive_anger', 'Explosive Anger'), ('detached_irony', 'Detached Irony'), ('hilarious', 'Hilarious'), ('poetic', 'Poetic'), ('existential_void', 'Existential Void'), ('acceptance', 'Acceptance'), ('confused', 'Confused')], max_length=25)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('departure_page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='engagement_rollups', to='app.departurepage')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'bucket_start'], name='app_engagem_granula_2dc48e_idx')],
+                'unique_together': {('granularity', 'bucket_start', 'departure_page')},
+            },
+        ),
+    ]
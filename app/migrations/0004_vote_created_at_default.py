@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-19 13:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_engagement_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vote',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-19 14:00
+
+import app.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_vote_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='departurepage',
+            name='design_version',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='departurepage',
+            name='design_data',
+            field=app.fields.CompressedJSONField(default=dict, editable=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-19 14:01
+
+from django.db import migrations, models
+
+from app.viewers import viewer_key_for_ip, viewer_key_for_user
+
+
+def backfill_viewer_keys(apps, schema_editor):
+    EphemeralReading = apps.get_model('app', 'EphemeralReading')
+    assigned = set()
+    batch = []
+    readings = EphemeralReading.objects.order_by('view_date').only('pk', 'departure_page_id', 'viewer_id', 'viewer_ip')
+    for reading in readings.iterator(chunk_size=2000):
+        if reading.viewer_id:
+            key = viewer_key_for_user(reading.viewer_id)
+        elif reading.viewer_ip:
+            key = viewer_key_for_ip(reading.viewer_ip)
+        else:
+            continue
+        # Older anonymous rows may repeat an IP; the first one keeps the key.
+        if (reading.departure_page_id, key) in assigned:
+            continue
+        assigned.add((reading.departure_page_id, key))
+        reading.viewer_key = key
+        batch.append(reading)
+        if len(batch) >= 1000:
+            EphemeralReading.objects.bulk_update(batch, ['viewer_key'])
+            batch = []
+    EphemeralReading.objects.bulk_update(batch, ['viewer_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_compact_design_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ephemeralreading',
+            name='viewer_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_viewer_keys, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='ephemeralreading',
+            unique_together={('departure_page', 'viewer'), ('departure_page', 'viewer_key')},
+        ),
+    ]
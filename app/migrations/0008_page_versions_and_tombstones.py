@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-19 14:08
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def initialize_pages(apps, schema_editor):
+    DeparturePage = apps.get_model('app', 'DeparturePage')
+    Vote = apps.get_model('app', 'Vote')
+    # votes_count was never incremented before (a Vote's uuid pk is set
+    # before save), so recount it from the votes themselves.
+    votes = Vote.objects.filter(departure_page=OuterRef('pk')).order_by().values('departure_page')
+    DeparturePage.objects.update(
+        updated_at=F('creation_date'),
+        votes_count=Coalesce(Subquery(votes.annotate(n=Count('pk')).values('n')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='departurepage',
+            name='updated_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='departurepage',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(initialize_pages, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='DeparturePageTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_id', models.UUIDField()),
+                ('user_id', models.UUIDField()),
+                ('was_public', models.BooleanField(default=False)),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'deleted_at'], name='app_departu_user_id_e88ba3_idx'), models.Index(fields=['was_public', 'deleted_at'], name='app_departu_was_pub_0d15ee_idx')],
+            },
+        ),
+    ]
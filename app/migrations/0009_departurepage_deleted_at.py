@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_page_versions_and_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='departurepage',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
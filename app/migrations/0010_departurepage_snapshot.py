@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_departurepage_deleted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='departurepage',
+            name='snapshot_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='departurepage',
+            name='snapshot_version',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_departurepage_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='departurepagetombstone',
+            name='unpublished',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_departurepagetombstone_unpublished'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='content_subtype',
+            field=models.CharField(default='plain', max_length=30),
+        ),
+    ]
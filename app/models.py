@@ -1,8 +1,17 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 import uuid
 
+from .fields import CompressedJSONField
+
 class CustomUser(AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False) 
 
@@ -10,6 +19,48 @@ class CustomUser(AbstractUser):
         return self.email if self.email else self.username  
 
 
+class DeparturePageQuerySet(models.QuerySet):
+
+    def visible_to(self, user):
+        """Public pages, plus the user's own ones; checked in SQL on user_id."""
+        if user.is_authenticated:
+            return self.filter(Q(is_public=True) | Q(user_id=user.pk))
+        return self.filter(is_public=True)
+
+    def with_stats(self):
+        """
+        Annotate each page with its engagement stats. Every aggregate is a
+        correlated subquery so the whole list is fetched in one query,
+        without multiplying reading and vote rows against each other.
+        """
+        readings = EphemeralReading.objects.filter(
+            departure_page=OuterRef('pk'), has_been_viewed=True
+        ).order_by().values('departure_page')
+        votes = Vote.objects.filter(
+            departure_page=OuterRef('pk')
+        ).order_by().values('departure_page')
+
+        def aggregate(queryset, expression):
+            return Subquery(queryset.annotate(value=expression).values('value'))
+
+        return self.annotate(
+            total_views=Coalesce(aggregate(readings, Count('pk')), 0),
+            # One viewer_key per signed-in user, or per address (and cookie)
+            # for anonymous readers; rows the backfill left without one
+            # repeat a key already counted.
+            unique_viewers=Coalesce(aggregate(readings, Count('viewer_key', distinct=True)), 0),
+            total_votes=Coalesce(aggregate(votes, Count('pk')), 0),
+            last_viewed=aggregate(readings, Max('view_date')),
+        )
+
+
+class DeparturePageManager(models.Manager.from_queryset(DeparturePageQuerySet)):
+    """Hides soft-deleted pages; use DeparturePage.all_objects to see them."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class DeparturePage(models.Model):
     BREAKUP = 'breakup'
     WORK = 'work'
@@ -53,7 +104,8 @@ class DeparturePage(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='departure_pages')
     title = models.CharField(max_length=255)
     content = models.TextField()
-    design_data = models.JSONField(default=dict)
+    design_data = CompressedJSONField(default=dict)
+    design_version = models.PositiveSmallIntegerField(default=1)
     template_id = models.CharField(max_length=100)
     creation_date = models.DateTimeField(default=timezone.now)
     is_public = models.BooleanField(default=False)
@@ -63,43 +115,222 @@ class DeparturePage(models.Model):
     tone = models.CharField(max_length=25, choices=EMOTIONAL_TONE_CHOICES, default=SADNESS)
     votes_count = models.PositiveIntegerField(default=0)
     image = models.ImageField(upload_to='departure_images/', null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+    version = models.PositiveIntegerField(default=1)
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Content hash and page version of the published share snapshot (app.snapshots).
+    snapshot_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    snapshot_version = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    objects = DeparturePageManager()
+    all_objects = DeparturePageQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Compared in save() to notice the page leaving the public feed.
+        instance._loaded_is_public = instance.__dict__.get('is_public')
+        return instance
+
+    @property
+    def was_unpublished(self):
+        """Whether the page was public when loaded and is no longer."""
+        return bool(getattr(self, '_loaded_is_public', False)) and not self.is_public
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+
+        self.updated_at = timezone.now()
+        self.version = F('version') + 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated_at', 'version'}
+        unpublished = self.was_unpublished and (update_fields is None or 'is_public' in update_fields)
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
+        if unpublished:
+            DeparturePageTombstone.objects.create(
+                page_id=self.pk, user_id=self.user_id, was_public=True, unpublished=True, deleted_at=self.updated_at
+            )
+        self._loaded_is_public = self.is_public
+
+    def touch(self, **deltas):
+        """
+        Record a change made outside save(): bump version and updated_at and
+        apply counter deltas such as votes_count=1, atomically in SQL.
+        """
+        DeparturePage.objects.filter(pk=self.pk).update(
+            updated_at=timezone.now(),
+            version=F('version') + 1,
+            **{name: F(name) + delta for name, delta in deltas.items()}
+        )
+        self.refresh_from_db(fields=['updated_at', 'version', *deltas])
+
+    def soft_delete(self):
+        """
+        Hide the page right away and leave removing its readings, votes and
+        image to the reaper (reap_deleted_pages), off the request thread.
+        """
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at'])
+        DeparturePageTombstone.objects.create(
+            page_id=self.pk, user_id=self.user_id, was_public=self.is_public, deleted_at=self.deleted_at
+        )
+
+
+class DeparturePageTombstone(models.Model):
+    """
+    Trace of a deleted page, so delta sync can report the deletion. A page
+    made private gets one too, with unpublished set: it is gone from the
+    public feed but not from its owner's pages.
+    """
+    page_id = models.UUIDField()
+    user_id = models.UUIDField()
+    was_public = models.BooleanField(default=False)
+    unpublished = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', 'deleted_at']),
+            models.Index(fields=['was_public', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.page_id} deleted {self.deleted_at}"
+
+
+@receiver(post_delete, sender=DeparturePage)
+def record_page_tombstone(sender, instance, **kwargs):
+    if instance.deleted_at is not None:
+        # Recorded when the page was soft-deleted.
+        return
+    DeparturePageTombstone.objects.create(
+        page_id=instance.pk, user_id=instance.user_id, was_public=instance.is_public
+    )
+
 
 class EphemeralReading(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     departure_page = models.ForeignKey(DeparturePage, on_delete=models.CASCADE, related_name='readings')
     viewer = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='viewed_pages')
     has_been_viewed = models.BooleanField(default=False)
-    view_date = models.DateTimeField(null=True, blank=True)
+    view_date = models.DateTimeField(null=True, blank=True, db_index=True)
     viewer_ip = models.GenericIPAddressField(null=True, blank=True)
-    
+    viewer_key = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
     class Meta:
-        unique_together = ['departure_page', 'viewer']
+        unique_together = [('departure_page', 'viewer'), ('departure_page', 'viewer_key')]
 
 
 class Vote(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     departure_page = models.ForeignKey(DeparturePage, on_delete=models.CASCADE, related_name='votes')
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='votes')
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
     
     class Meta:
         unique_together = ['departure_page', 'user']
     
     def save(self, *args, **kwargs):
-        is_new_vote = self.pk is None
+        is_new_vote = self._state.adding
         
         super().save(*args, **kwargs)
         
         if is_new_vote:
-            self.departure_page.votes_count += 1
-            self.departure_page.save(update_fields=['votes_count'])
+            self.departure_page.touch(votes_count=1)
+            RollupWatermark.rewind_for(self.created_at)
     
     def delete(self, *args, **kwargs):
-        self.departure_page.votes_count -= 1
-        self.departure_page.save(update_fields=['votes_count'])
+        self.departure_page.touch(votes_count=-1)
         
-        super().delete(*args, **kwargs)
\ No newline at end of file
+        super().delete(*args, **kwargs)
+        RollupWatermark.rewind_for(self.created_at)
+
+
+class EngagementRollup(models.Model):
+    HOUR = 'hour'
+    DAY = 'day'
+
+    GRANULARITY_CHOICES = [
+        (HOUR, 'Hourly'),
+        (DAY, 'Daily'),
+    ]
+
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    departure_page = models.ForeignKey(DeparturePage, on_delete=models.CASCADE, related_name='engagement_rollups')
+    ending_type = models.CharField(max_length=20, choices=DeparturePage.ENDING_TYPE_CHOICES)
+    tone = models.CharField(max_length=25, choices=DeparturePage.EMOTIONAL_TONE_CHOICES)
+    views = models.PositiveIntegerField(default=0)
+    votes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['granularity', 'bucket_start', 'departure_page']
+        indexes = [
+            models.Index(fields=['granularity', 'bucket_start']),
+        ]
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    def rewind_for(cls, event_time):
+        """
+        Move watermarks back to event_time when a row is added or removed
+        with an event time they may already have passed, so that the next
+        rollup recomputes its buckets. Costs nothing for current events.
+        """
+        margin = timedelta(seconds=getattr(settings, 'ROLLUP_MARGIN_SECONDS', 60))
+        if event_time is not None and event_time < timezone.now() - margin:
+            cls.objects.filter(value__gt=event_time).update(value=event_time)
+
+
+class OutboundEmail(models.Model):
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=998)
+    body = models.TextField(blank=True)
+    # MIME subtype of body: 'html' for messages sent as HTML only.
+    content_subtype = models.CharField(max_length=30, default='plain')
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list)
+    bcc = models.JSONField(default=list)
+    reply_to = models.JSONField(default=list)
+    headers = models.JSONField(default=dict)
+    alternatives = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)}"
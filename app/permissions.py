@@ -1,19 +1,41 @@
 from rest_framework import permissions
 
 
+def is_owner(request, obj):
+    """
+    Whether request.user owns obj. Compares foreign key ids so the related
+    user is never loaded, and remembers the answer for the rest of the
+    request.
+    """
+    cache = getattr(request, 'ownership_cache', None)
+    if cache is None:
+        cache = request.ownership_cache = {}
+
+    key = (type(obj), obj.pk)
+    if key not in cache:
+        if hasattr(obj, 'user_id'):
+            owner_id = obj.user_id
+        elif hasattr(obj, 'recipient_id'):
+            owner_id = obj.recipient_id
+        else:
+            owner_id = None
+        cache[key] = (
+            owner_id is not None
+            and request.user.is_authenticated
+            and owner_id == request.user.pk
+        )
+    return cache[key]
+
+
 class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        return obj.user == request.user
+        return is_owner(request, obj)
 
 
 class IsOwner(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
-        if hasattr(obj, 'user'):
-            return obj.user == request.user
-        elif hasattr(obj, 'recipient'):
-            return obj.recipient == request.user
-        return False
\ No newline at end of file
+        return is_owner(request, obj)
@@ -0,0 +1,240 @@
+import logging
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CONFIG_KEY = 'profiling:config'
+CURSOR_KEY = 'profiling:cursor'
+SLOT_KEY = 'profiling:slot:{}'
+MAX_QUERIES = 500
+MAX_SQL_LENGTH = 2000
+MAX_STACK_DEPTH = 128
+
+
+def get_cache():
+    return caches[getattr(settings, 'PROFILING_CACHE_ALIAS', 'default')]
+
+
+def cache_is_shared():
+    """False when the toggle and captures only reach the worker that handles the request."""
+    return not isinstance(get_cache(), (LocMemCache, DummyCache))
+
+
+class ProfilingConfig:
+    """
+    What a staff member switched on: a percentage of requests and/or one URL
+    name to profile, until it expires. Kept in the cache so every worker
+    sees it, and re-read by each process at most every
+    PROFILING_CONFIG_REFRESH seconds so that checking it costs nothing.
+    """
+
+    def __init__(self):
+        self.data = None
+        self.checked_at = float('-inf')
+
+    def get(self):
+        now = time.monotonic()
+        if now - self.checked_at >= getattr(settings, 'PROFILING_CONFIG_REFRESH', 5):
+            self.checked_at = now
+            try:
+                self.data = get_cache().get(CONFIG_KEY)
+            except Exception:
+                logger.warning("Profiling config unavailable", exc_info=True)
+                self.data = None
+        return self.data
+
+    def set(self, sample_rate=0, url_name=None, duration=600):
+        data = {
+            'sample_rate': sample_rate,
+            'url_name': url_name,
+            'expires_at': (timezone.now() + timedelta(seconds=duration)).isoformat(),
+        }
+        get_cache().set(CONFIG_KEY, data, duration)
+        self.data, self.checked_at = data, time.monotonic()
+        return data
+
+    def clear(self):
+        get_cache().delete(CONFIG_KEY)
+        self.data, self.checked_at = None, time.monotonic()
+
+    def selects(self, url_name):
+        data = self.get()
+        if not data:
+            return False
+        if data['url_name'] and data['url_name'] == url_name:
+            return True
+        return random.random() * 100 < data['sample_rate']
+
+
+config = ProfilingConfig()
+
+
+class RequestTrace:
+    """SQL and stack samples collected for one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.thread_id = threading.get_ident()
+        self.profiled = False
+        self.queries = []
+        self.query_count = 0
+        self.query_time = 0.0
+        self.stacks = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper recording each statement and its duration."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.query_count += 1
+            self.query_time += elapsed
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append({'sql': sql[:MAX_SQL_LENGTH], 'ms': round(elapsed * 1000, 2), 'many': many})
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+def collapse_stack(frame):
+    """A frame's stack in collapsed ("folded") flame graph format, root first."""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the stacks of request threads every PROFILING_SAMPLE_INTERVAL
+    seconds: from the start for profiled requests, and once they have run for
+    `sample_after` seconds for the others, so a request that turns out slow
+    still has samples of where it spent its time. Requests never wake it:
+    while it has nothing to sample it checks for new requests every half
+    `sample_after`, so starting and finishing a request only touch a dict.
+    Profiled requests, which are rare, wake it to be sampled right away.
+    """
+
+    def __init__(self, interval, sample_after):
+        super().__init__(name='request-stack-sampler', daemon=True)
+        self.interval = interval
+        self.sample_after = sample_after
+        self.traces = {}
+        self.wakeup = threading.Event()
+
+    def add(self, trace):
+        self.traces[trace.thread_id] = trace
+
+    def remove(self, trace):
+        self.traces.pop(trace.thread_id, None)
+
+    def run(self):
+        while True:
+            self.wakeup.clear()
+            now = time.perf_counter()
+            traces = list(self.traces.values())
+            due = [trace for trace in traces if trace.profiled or now - trace.start >= self.sample_after]
+            if due:
+                frames = sys._current_frames()
+                for trace in due:
+                    frame = frames.get(trace.thread_id)
+                    if frame is not None:
+                        trace.stacks[collapse_stack(frame)] += 1
+                del frames
+                delay = self.interval
+            elif traces:
+                # Nothing to sample until the oldest request gets slow.
+                next_due = min(trace.start for trace in traces) + self.sample_after - now
+                delay = None if math.isinf(next_due) else max(next_due, self.interval)
+            else:
+                delay = None if math.isinf(self.sample_after) else max(self.sample_after / 2, self.interval)
+            self.wakeup.wait(delay)
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """The process' sampler thread, started on first use so it runs in workers, not the master."""
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                slow_ms = getattr(settings, 'PROFILING_SLOW_REQUEST_MS', 0)
+                sampler = StackSampler(
+                    interval=getattr(settings, 'PROFILING_SAMPLE_INTERVAL', 0.01),
+                    sample_after=slow_ms / 2000 if slow_ms else float('inf'),
+                )
+                sampler.start()
+                _sampler = sampler
+    return _sampler
+
+
+def save_capture(capture):
+    """
+    Store capture in a ring buffer of PROFILING_BUFFER_SIZE cache slots
+    shared by all workers; the oldest capture is overwritten once it is full.
+    """
+    size = getattr(settings, 'PROFILING_BUFFER_SIZE', 50)
+    cache = get_cache()
+    try:
+        cache.add(CURSOR_KEY, 0, None)
+        slot = cache.incr(CURSOR_KEY) % size
+        cache.set(SLOT_KEY.format(slot), capture, getattr(settings, 'PROFILING_RETENTION', 24 * 60 * 60))
+    except Exception:
+        logger.warning("Could not store request capture %s", capture['id'], exc_info=True)
+
+
+def list_captures():
+    """Captures in the ring buffer, newest first."""
+    size = getattr(settings, 'PROFILING_BUFFER_SIZE', 50)
+    captures = get_cache().get_many([SLOT_KEY.format(slot) for slot in range(size)]).values()
+    return sorted(captures, key=lambda capture: capture['time'], reverse=True)
+
+
+def get_capture(capture_id):
+    return next((capture for capture in list_captures() if capture['id'] == capture_id), None)
+
+
+def build_capture(request, response, trace, reason):
+    match = getattr(request, 'resolver_match', None)
+    return {
+        'id': uuid.uuid4().hex,
+        'time': timezone.now().isoformat(),
+        'reason': reason,
+        'method': request.method,
+        'path': request.path,
+        'url_name': match.url_name if match else None,
+        'status': response.status_code,
+        'duration_ms': round(trace.elapsed() * 1000, 1),
+        'query_count': trace.query_count,
+        'query_ms': round(trace.query_time * 1000, 1),
+        'queries': trace.queries,
+        'sample_interval_ms': getattr(settings, 'PROFILING_SAMPLE_INTERVAL', 0.01) * 1000,
+        'stacks': dict(trace.stacks),
+    }
+
+
+def folded_stacks(captures):
+    """Merge captures' stack samples into one collapsed-stack text, for flamegraph.pl or speedscope."""
+    stacks = Counter()
+    for capture in captures:
+        stacks.update(capture['stacks'])
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
@@ -0,0 +1,73 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import DeparturePage, EngagementRollup, EphemeralReading, Vote
+from .snapshots import delete_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Rows hanging off a page, removed before the page row itself.
+DEPENDENTS = (
+    ('readings', EphemeralReading),
+    ('votes', Vote),
+    ('rollups', EngagementRollup),
+)
+
+
+def pending_pages(grace=timedelta(0)):
+    return DeparturePage.all_objects.filter(deleted_at__lte=timezone.now() - grace)
+
+
+def delete_in_batches(model, page_id, batch_size):
+    """Delete a page's rows of model, batch_size rows per short transaction."""
+    deleted = 0
+    while True:
+        ids = list(model.objects.filter(departure_page_id=page_id).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            model.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+def reap_page(page, batch_size=1000):
+    """Remove a soft-deleted page: dependent rows, then its image and snapshots, then the page."""
+    counts = {}
+    for name, model in DEPENDENTS:
+        counts[name] = delete_in_batches(model, page.pk, batch_size)
+    if page.image:
+        page.image.delete(save=False)
+    delete_snapshots(page.pk)
+    page.delete()
+    return counts
+
+
+def reap_deleted_pages(batch_size=1000, max_pages=None, grace=timedelta(0)):
+    """Hard-delete soft-deleted pages, oldest first. Returns totals per kind of row."""
+    totals = {'pages': 0, **{name: 0 for name, _ in DEPENDENTS}}
+    pages = pending_pages(grace).order_by('deleted_at').only('pk', 'user_id', 'image', 'is_public', 'deleted_at')
+    for page in pages[:max_pages] if max_pages else pages:
+        counts = reap_page(page, batch_size)
+        totals['pages'] += 1
+        for name, count in counts.items():
+            totals[name] += count
+        logger.info("Reaped page %s: %s", page.pk, counts)
+    return totals
+
+
+def reaper_backlog():
+    """What the reaper still has to do, for monitoring its progress."""
+    pages = DeparturePage.all_objects.filter(deleted_at__isnull=False)
+    summary = pages.aggregate(pages=Count('pk'), oldest=Min('deleted_at'))
+    backlog = {
+        'pending_pages': summary['pages'],
+        'oldest_deleted_at': summary['oldest'],
+        'lag_seconds': (timezone.now() - summary['oldest']).total_seconds() if summary['oldest'] else 0,
+    }
+    for name, model in DEPENDENTS:
+        backlog[f'pending_{name}'] = model.objects.filter(departure_page__deleted_at__isnull=False).count()
+    return backlog
@@ -2,6 +2,9 @@ from rest_framework import serializers
 from .models import CustomUser, DeparturePage, EphemeralReading, Vote
 from dj_rest_auth.serializers import UserDetailsSerializer
 from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist
+
+from .design import DESIGN_SCHEMA_VERSION, carry_design, design_overrides, effective_design, validate_design
 
 class CustomUserDetailsSerializer(UserDetailsSerializer):
     class Meta(UserDetailsSerializer.Meta):
@@ -9,23 +12,108 @@ class CustomUserDetailsSerializer(UserDetailsSerializer):
         fields = UserDetailsSerializer.Meta.fields
         read_only_fields = ('email',)
 
+class EagerLoadingMixin:
+    """
+    Derive select_related()/only() from the serializer's declared fields so
+    that serializing a queryset costs a single query whatever its size.
+    """
+
+    @classmethod
+    def get_eager_loading_fields(cls):
+        related = []
+        only = []
+        model = cls.Meta.model
+        for name, field in cls().fields.items():
+            source = field.source or name
+            if source == '*' or '.' in source:
+                continue
+            if isinstance(field, serializers.BaseSerializer) and not getattr(field, 'many', False):
+                related_model = model._meta.get_field(source).related_model
+                related.append(source)
+                only.append(source)
+                only.extend(
+                    f'{source}__{sub_name}'
+                    for sub_name, sub_field in field.fields.items()
+                    if _is_concrete(related_model, sub_field.source or sub_name)
+                )
+            elif _is_concrete(model, source):
+                only.append(source)
+        return related, only
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, *extra_fields):
+        related, only = cls.get_eager_loading_fields()
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*only, *getattr(cls, 'eager_loading_extra_fields', ()), *extra_fields)
+
+
+def _is_concrete(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return getattr(field, 'concrete', False) and not field.many_to_many
+
+
+class DesignDataMixin:
+    """
+    Validate design_data against its template and store only the settings
+    that differ from the template defaults; responses merge them back in.
+    """
+    eager_loading_extra_fields = ('design_version',)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        previous_template = getattr(self.instance, 'template_id', None)
+        template_id = attrs.get('template_id', previous_template)
+        design_data = attrs.get('design_data')
+        if design_data is None and self.instance is not None and template_id != previous_template:
+            # The stored overrides are relative to the previous template:
+            # carry the design as it looked over to the new one.
+            design_data = carry_design(effective_design(self.instance), previous_template, template_id)
+        if design_data is not None:
+            errors = validate_design(design_data, template_id)
+            if errors:
+                raise serializers.ValidationError({'design_data': errors})
+            attrs['design_data'] = design_overrides(design_data, template_id)
+            attrs['design_version'] = DESIGN_SCHEMA_VERSION
+        return attrs
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if 'design_data' in data:
+            data['design_data'] = effective_design(instance)
+        return data
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ['id', 'username', 'email']
 
 
-class DeparturePageSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
+class PageAuthorSerializer(UserSerializer):
+    """Nested author that is never loaded nor exposed for anonymous pages."""
+
+    def get_attribute(self, instance):
+        if instance.is_anonymous:
+            return None
+        return super().get_attribute(instance)
+
+
+class DeparturePageSerializer(EagerLoadingMixin, DesignDataMixin, serializers.ModelSerializer):
+    user = PageAuthorSerializer(read_only=True)
+    design_data = serializers.JSONField(required=False)
     
     class Meta:
         model = DeparturePage
         fields = [
             'id', 'user', 'title', 'content', 'design_data', 'template_id',
             'creation_date', 'is_public', 'is_anonymous', 'is_ephemeral',
-            'ending_type', 'tone'
+            'ending_type', 'tone', 'updated_at', 'version'
         ]
-        read_only_fields = ['id', 'user', 'creation_date']
+        read_only_fields = ['id', 'user', 'creation_date', 'updated_at', 'version']
     
     def create(self, validated_data):
         request = self.context.get('request')
@@ -33,7 +121,24 @@ class DeparturePageSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class DeparturePageCreateSerializer(serializers.ModelSerializer):
+class DeparturePageStatsSerializer(serializers.ModelSerializer):
+    total_views = serializers.IntegerField(read_only=True)
+    unique_viewers = serializers.IntegerField(read_only=True)
+    total_votes = serializers.IntegerField(read_only=True)
+    last_viewed = serializers.DateTimeField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = DeparturePage
+        fields = [
+            'id', 'title', 'template_id', 'creation_date', 'is_public',
+            'is_anonymous', 'is_ephemeral', 'ending_type', 'tone',
+            'total_views', 'unique_viewers', 'total_votes', 'last_viewed'
+        ]
+        read_only_fields = fields
+
+
+class DeparturePageCreateSerializer(DesignDataMixin, serializers.ModelSerializer):
+    design_data = serializers.JSONField(required=False)
     image_url = serializers.SerializerMethodField()
 
     class Meta:
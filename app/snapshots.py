@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+
+from .models import DeparturePage
+from .serializers import DeparturePageSerializer
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_STORAGE = 'snapshots'
+SNAPSHOT_TEMPLATE = 'snapshots/page.html'
+SNAPSHOT_FORMATS = ('json', 'html')
+# Change on every vote without the page itself changing, so they are left
+# out and the content hash only moves on real edits.
+VOLATILE_FIELDS = ('updated_at', 'version')
+
+
+def get_storage():
+    return storages[SNAPSHOT_STORAGE]
+
+
+def is_snapshotable(page):
+    """
+    Only public, non-ephemeral pages get a snapshot: an ephemeral page is
+    read once per viewer, which a cached copy could not enforce.
+    """
+    return page.is_public and not page.is_ephemeral
+
+
+def snapshot_name(page_id, digest, fmt):
+    return f'{page_id}/{digest}.{fmt}'
+
+
+def snapshot_url(page):
+    """Public URL of the page's current HTML snapshot, None if it has none."""
+    if not page.snapshot_hash:
+        return None
+    return get_storage().url(snapshot_name(page.pk, page.snapshot_hash, 'html'))
+
+
+def render_snapshot(page):
+    """Return (digest, {format: bytes}) for page, the digest hashing its JSON."""
+    data = DeparturePageSerializer(page).data
+    for name in VOLATILE_FIELDS:
+        data.pop(name, None)
+    body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(body).hexdigest()[:20]
+
+    storage = get_storage()
+    html = render_to_string(SNAPSHOT_TEMPLATE, {
+        'page': data,
+        'url': storage.url(snapshot_name(page.pk, digest, 'html')),
+        'json_url': storage.url(snapshot_name(page.pk, digest, 'json')),
+        'front_host': getattr(settings, 'FRONT_HOST', None),
+    })
+    return digest, {'json': body, 'html': html.encode('utf-8')}
+
+
+def write_snapshot(page):
+    """
+    Store page's snapshot, point the page at it and remove the snapshots it
+    supersedes, so content edited out of a page is not served any longer.
+    Files are named by content hash and never rewritten, so an unchanged
+    page costs no write.
+    """
+    digest, files = render_snapshot(page)
+    storage = get_storage()
+    for fmt, content in files.items():
+        name = snapshot_name(page.pk, digest, fmt)
+        if not storage.exists(name):
+            storage.save(name, ContentFile(content))
+    # Not through save(), which would bump the version and make the
+    # snapshot stale again.
+    DeparturePage.all_objects.filter(pk=page.pk).update(snapshot_hash=digest, snapshot_version=page.version)
+    page.snapshot_hash, page.snapshot_version = digest, page.version
+    delete_snapshots(page.pk, keep=digest)
+    return digest
+
+
+def delete_snapshots(page_id, keep=None):
+    """Remove the snapshots written for a page, except those of digest keep."""
+    storage = get_storage()
+    try:
+        _, files = storage.listdir(str(page_id))
+    except FileNotFoundError:
+        return 0
+    stale = [filename for filename in files if keep is None or filename.split('.')[0] != keep]
+    for filename in stale:
+        storage.delete(f'{page_id}/{filename}')
+    return len(stale)
+
+
+def withdraw_snapshots(page_id):
+    delete_snapshots(page_id)
+    DeparturePage.all_objects.filter(pk=page_id).update(snapshot_hash='', snapshot_version=None)
+
+
+def stale_pages():
+    """Pages that should have a snapshot of their current version but do not."""
+    return DeparturePage.objects.filter(is_public=True, is_ephemeral=False).exclude(snapshot_version=F('version'))
+
+
+def withdrawn_pages():
+    """Pages that still have a snapshot but were made private or ephemeral."""
+    return DeparturePage.objects.exclude(snapshot_hash='').filter(Q(is_public=False) | Q(is_ephemeral=True))
+
+
+def refresh_snapshots(batch_size=100):
+    """Bring snapshots in line with their pages. Returns (built, withdrawn)."""
+    built = 0
+    pages = DeparturePageSerializer.setup_eager_loading(stale_pages(), 'snapshot_hash', 'snapshot_version')
+    for page in pages.order_by('updated_at')[:batch_size]:
+        try:
+            write_snapshot(page)
+        except Exception:
+            logger.exception("Building the snapshot of page %s failed", page.pk)
+        else:
+            built += 1
+
+    withdrawn = 0
+    for page_id in withdrawn_pages().values_list('pk', flat=True)[:batch_size]:
+        withdraw_snapshots(page_id)
+        withdrawn += 1
+    return built, withdrawn
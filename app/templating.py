@@ -0,0 +1,71 @@
+import hashlib
+import logging
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template import TemplateSyntaxError, engines
+from django.template.loader import render_to_string
+
+logger = logging.getLogger(__name__)
+
+# Rendered in place of the CSRF token so cached HTML can be shared between
+# visitors; the real per-request token is substituted on the way out.
+CSRF_PLACEHOLDER = 'csrf-token-placeholder-3f9c2a'
+
+
+def project_template_names(engine):
+    for directory in engine.engine.dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(('.html', '.txt')):
+                    yield os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    """Compile every project template so the cached loader holds them before the first request."""
+    compiled = 0
+    for engine in engines.all():
+        if not hasattr(engine, 'engine'):
+            continue
+        for name in project_template_names(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as e:
+                logger.error("Template %s does not compile: %s", name, e)
+            else:
+                compiled += 1
+    return compiled
+
+
+def render_cached(request, template_name, context, key):
+    """
+    Render template_name like TemplateResponse would, reusing the HTML cached
+    under key for TEMPLATE_FRAGMENT_CACHE_TIMEOUT seconds. Only templates that
+    need nothing from the request other than {% csrf_token %} may be cached.
+    """
+    timeout = getattr(settings, 'TEMPLATE_FRAGMENT_CACHE_TIMEOUT', 0)
+    cache_key = None
+    html = None
+    if timeout:
+        digest = hashlib.sha256(str(key).encode('utf-8')).hexdigest()
+        cache_key = f'tpl:{template_name}:{digest}'
+        try:
+            html = cache.get(cache_key)
+        except Exception:
+            logger.warning("Template cache unavailable", exc_info=True)
+            cache_key = None
+
+    if html is None:
+        html = render_to_string(template_name, {**context, 'csrf_token': CSRF_PLACEHOLDER})
+        if cache_key:
+            try:
+                cache.set(cache_key, html, timeout)
+            except Exception:
+                logger.warning("Template cache unavailable", exc_info=True)
+
+    if CSRF_PLACEHOLDER in html:
+        html = html.replace(CSRF_PLACEHOLDER, get_token(request))
+    return HttpResponse(html)
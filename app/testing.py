@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def count_queries(func, *args, **kwargs):
+    """Run func and return how many SQL queries it executed."""
+    with CaptureQueriesContext(connection) as ctx:
+        func(*args, **kwargs)
+    return len(ctx.captured_queries)
+
+
+def assert_constant_queries(testcase, build, run, sizes=(1, 5, 20)):
+    """
+    Assert that run() executes the same number of queries whatever the size
+    of the data set: build(n) prepares n rows, run() is then measured.
+    """
+    counts = {}
+    for size in sizes:
+        build(size)
+        counts[size] = count_queries(run)
+    testcase.assertEqual(
+        len(set(counts.values())), 1,
+        f"Query count depends on list size: {counts}"
+    )
+    return counts
+
+
+@contextmanager
+def assert_max_queries(testcase, limit):
+    with CaptureQueriesContext(connection) as ctx:
+        yield ctx
+    testcase.assertLessEqual(
+        len(ctx.captured_queries), limit,
+        "\n".join(q['sql'] for q in ctx.captured_queries)
+    )
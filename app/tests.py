@@ -1,3 +1,1146 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import profiling, viewers
+from .analytics import WATERMARK_NAME, run_rollup
+from .fields import COMPRESSED_MAGIC, encode_json
+from .mail import deliver_outbox, prune_outbox
+from .middleware import ConditionalETagMiddleware
+from .reaper import reap_deleted_pages, reaper_backlog
+from .snapshots import refresh_snapshots
+from .models import (
+    CustomUser, DeparturePage, DeparturePageTombstone, EngagementRollup, EphemeralReading, OutboundEmail,
+    RollupWatermark, Vote
+)
+from .testing import assert_constant_queries, assert_max_queries
+from .throttling import CacheStore, MemoryStore
+from .transfer import NDJSONImporter, TransferError
+from .viewers import VIEWER_TOKEN_COOKIE, seen_readings, viewer_key_for_ip, viewer_key_for_user
+
+
+class FakeSMTP:
+    """Local SMTP stand-in recording the messages it accepts."""
+
+    def __init__(self):
+        self.messages = []
+        self.reject_sender = False
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(f'{line}\r\n'.encode())
+
+            def handle(self):
+                self.reply('220 localhost ready')
+                while line := self.rfile.readline():
+                    command = line.decode().strip().upper()
+                    if command.startswith(('EHLO', 'HELO')):
+                        self.reply('250 localhost')
+                    elif command.startswith('MAIL FROM'):
+                        self.reply('451 Try again later' if fake.reject_sender else '250 OK')
+                    elif command.startswith('DATA'):
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        data = []
+                        while (line := self.rfile.readline()) not in (b'.\r\n', b''):
+                            data.append(line.decode())
+                        fake.messages.append(''.join(data))
+                        self.reply('250 OK')
+                    elif command.startswith('QUIT'):
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('250 OK')
+
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        self.smtp = FakeSMTP()
+        self.addCleanup(self.smtp.close)
+        overrides = override_settings(
+            EMAIL_BACKEND='app.mail.OutboxEmailBackend',
+            EMAIL_DELIVERY_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.smtp.port,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+            EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+            EMAIL_OUTBOX_RETRY_DELAY=60,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def queue(self):
+        mail.send_mail('Reset', 'https://example.com/reset/abc', 'noreply@example.com', ['ada@example.com'])
+        return OutboundEmail.objects.get()
+
+    def retry_now(self, email):
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+
+    def test_backend_queues_without_sending(self):
+        email = self.queue()
+        self.assertEqual(email.status, OutboundEmail.QUEUED)
+        self.assertEqual(email.to, ['ada@example.com'])
+        self.assertEqual(self.smtp.messages, [])
+
+    def test_delivery_marks_sent_and_drops_body(self):
+        email = self.queue()
+        self.assertEqual(deliver_outbox(), (1, 0))
+        self.assertEqual(len(self.smtp.messages), 1)
+        self.assertIn('https://example.com/reset/abc', self.smtp.messages[0])
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.SENT)
+        self.assertEqual((email.body, email.alternatives), ('', []))
+        self.assertIsNotNone(email.sent_at)
+
+    def test_html_only_message_keeps_its_content_type(self):
+        message = EmailMessage(
+            'Confirm', '<p>Confirm your address</p>', 'noreply@example.com', ['ada@example.com']
+        )
+        message.content_subtype = 'html'
+        message.send()
+        self.assertEqual(OutboundEmail.objects.get().content_subtype, 'html')
+        deliver_outbox()
+        self.assertIn('Content-Type: text/html', self.smtp.messages[0])
+
+    def test_refused_message_is_retried_with_backoff(self):
+        self.smtp.reject_sender = True
+        email = self.queue()
+
+        before = timezone.now()
+        self.assertEqual(deliver_outbox(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.QUEUED, 1))
+        self.assertIn('451', email.last_error)
+        self.assertAlmostEqual(email.next_attempt_at, before + timedelta(seconds=60), delta=timedelta(seconds=5))
+        self.assertEqual(deliver_outbox(), (0, 0), "Retried before its backoff")
+
+        self.retry_now(email)
+        before = timezone.now()
+        deliver_outbox()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.QUEUED, 2))
+        self.assertAlmostEqual(email.next_attempt_at, before + timedelta(seconds=120), delta=timedelta(seconds=5))
+
+        self.smtp.reject_sender = False
+        self.retry_now(email)
+        self.assertEqual(deliver_outbox(), (1, 0))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.last_error), (OutboundEmail.SENT, 3, ''))
+
+    def test_gives_up_after_max_attempts(self):
+        self.smtp.reject_sender = True
+        email = self.queue()
+        for _ in range(3):
+            self.retry_now(email)
+            deliver_outbox()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.FAILED, 3))
+        self.retry_now(email)
+        self.assertEqual(deliver_outbox(), (0, 0))
+        self.assertEqual(self.smtp.messages, [])
+
+    def test_prune_keeps_recent_and_pending_mail(self):
+        old = timezone.now() - timedelta(days=30)
+        for status in (OutboundEmail.SENT, OutboundEmail.FAILED, OutboundEmail.QUEUED):
+            OutboundEmail.objects.create(subject=status, from_email='noreply@example.com', status=status, created_at=old)
+        OutboundEmail.objects.create(subject='recent', from_email='noreply@example.com', status=OutboundEmail.SENT)
+
+        with override_settings(EMAIL_OUTBOX_RETENTION_DAYS=7):
+            self.assertEqual(prune_outbox(), 2)
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list('subject', flat=True)), [OutboundEmail.QUEUED, 'recent']
+        )
+
+    def test_command_delivers_then_prunes(self):
+        self.queue()
+        OutboundEmail.objects.create(
+            subject='old', from_email='noreply@example.com', status=OutboundEmail.SENT,
+            created_at=timezone.now() - timedelta(days=30),
+        )
+        call_command('send_queued_mail', stdout=StringIO())
+        self.assertEqual(len(self.smtp.messages), 1)
+        self.assertEqual(list(OutboundEmail.objects.values_list('status', flat=True)), [OutboundEmail.SENT])
+
+
+@override_settings(SYNC_CURSOR_MARGIN_SECONDS=0)
+class QueryCountTests(TestCase):
+    """
+    List endpoints run an exact number of queries, however many pages, and
+    authors, and readers of them there are.
+    """
+
+    def setUp(self):
+        self.authors = [
+            CustomUser.objects.create_user(username=f'author{i}', email=f'author{i}@example.com', password='x')
+            for i in range(3)
+        ]
+        self.reader = CustomUser.objects.create_user(username='reader', email='reader@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.authors[0])
+
+    def build(self, count):
+        for i in range(count):
+            page = DeparturePage.objects.create(
+                user=self.authors[i % len(self.authors)], title=f'Page {i}', content='Goodbye',
+                template_id='classic', is_public=True, is_anonymous=i % 2 == 0,
+            )
+            EphemeralReading.objects.create(
+                departure_page=page, viewer=self.reader, viewer_key=viewer_key_for_user(self.reader.pk),
+                has_been_viewed=True, view_date=timezone.now(),
+            )
+            Vote.objects.create(departure_page=page, user=self.reader)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, getattr(response, 'content', b''))
+        if response.streaming:
+            return b''.join(response.streaming_content)
+        return response
+
+    def assert_queries(self, budget, run):
+        counts = assert_constant_queries(self, self.build, run)
+        self.assertEqual(set(counts.values()), {budget}, counts)
+
+    def test_list(self):
+        # The ETag's aggregate, then the list.
+        self.assert_queries(2, lambda: self.get('/api/pages/'))
+        self.assertEqual(len(self.get('/api/pages/').json()), 26)
+
+    def test_mine(self):
+        self.assert_queries(1, lambda: self.get('/api/pages/mine/'))
+        pages = self.get('/api/pages/mine/').json()
+        self.assertEqual(len(pages), 7 + 2 + 1)
+        self.assertEqual({(page['total_views'], page['total_votes']) for page in pages}, {(1, 1)})
+
+    def test_export(self):
+        self.client.force_authenticate(CustomUser.objects.create_user(
+            username='staff', email='staff@example.com', password='x', is_staff=True
+        ))
+        # Pages, readings and votes: one query each.
+        self.assert_queries(3, lambda: self.get('/api/pages/export/', include='readings,votes'))
+        self.assertEqual(len(self.get('/api/pages/export/', include='readings,votes').splitlines()), 26 * 3)
+
+    def test_public_sync(self):
+        since = (timezone.now() - timedelta(minutes=1)).isoformat()
+        # Changed pages and deleted ids.
+        self.assert_queries(2, lambda: self.get('/api/pages/sync/', scope='public', since=since))
+        changed = self.get('/api/pages/sync/', scope='public', since=since).json()['changed']
+        self.assertEqual(len(changed), 26)
+        self.assertEqual(sum(page['user'] is None for page in changed), 10 + 3 + 1)
+
+    def test_anonymous_page_hides_its_author(self):
+        page = DeparturePage.objects.create(
+            user=self.authors[1], title='Anonymous', content='Goodbye', template_id='classic',
+            is_public=True, is_anonymous=True,
+        )
+        with assert_max_queries(self, 1) as ctx:
+            response = self.get(f'/api/pages/{page.pk}/')
+        self.assertIsNone(response.json()['user'])
+        self.assertNotIn(self.authors[1].username, response.content.decode())
+        # The author comes joined to the page, never through a query of its own.
+        user_table = f'FROM "{CustomUser._meta.db_table}"'
+        self.assertFalse(any(user_table in query['sql'].replace('`', '"') for query in ctx.captured_queries))
+
+
+class DashboardTests(TestCase):
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com', password='x')
+        self.readers = [
+            CustomUser.objects.create_user(username=f'reader{i}', email=f'reader{i}@example.com', password='x')
+            for i in range(2)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def read(self, page, viewer=None, ip=None, viewed=True, when=None):
+        return EphemeralReading.objects.create(
+            departure_page=page, viewer=viewer, viewer_ip=ip, has_been_viewed=viewed,
+            viewer_key=viewer_key_for_user(viewer.pk) if viewer else viewer_key_for_ip(ip),
+            view_date=when if viewed else None,
+        )
+
+    def test_stats_in_one_query(self):
+        read = DeparturePage.objects.create(user=self.author, title='Read', content='Goodbye', template_id='classic')
+        unread = DeparturePage.objects.create(
+            user=self.author, title='Unread', content='Goodbye', template_id='classic',
+            creation_date=timezone.now() - timedelta(days=1),
+        )
+        DeparturePage.objects.create(user=self.readers[0], title='Not mine', content='Goodbye', template_id='classic')
+        last = timezone.now()
+        self.read(read, viewer=self.readers[0], when=last - timedelta(hours=1))
+        self.read(read, viewer=self.readers[1], when=last)
+        self.read(read, ip='203.0.113.7', when=last - timedelta(hours=2))
+        self.read(read, ip='203.0.113.8', viewed=False)
+        for reader in self.readers:
+            Vote.objects.create(departure_page=read, user=reader)
+
+        with assert_max_queries(self, 1):
+            response = self.client.get('/api/pages/mine/')
+        self.assertEqual(response.status_code, 200)
+        stats = {page['title']: page for page in response.json()}
+        self.assertEqual(list(stats), ['Read', 'Unread'])
+        self.assertEqual(
+            (stats['Read']['total_views'], stats['Read']['unique_viewers'], stats['Read']['total_votes']), (3, 3, 2)
+        )
+        self.assertEqual(parse_datetime(stats['Read']['last_viewed']), last)
+        self.assertEqual(
+            (stats['Unread']['total_views'], stats['Unread']['unique_viewers'], stats['Unread']['total_votes']),
+            (0, 0, 0),
+        )
+        self.assertIsNone(stats['Unread']['last_viewed'])
+
+
+class EngagementAnalyticsTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            CustomUser.objects.create_user(username='author', email='author@example.com', password='x')
+        )
+
+    def test_invalid_dates_are_rejected(self):
+        for value in ('2024-02-30T00:00:00', 'yesterday'):
+            response = self.client.get('/api/analytics/engagement/', {'start': value})
+            self.assertEqual(response.status_code, 400, value)
+            self.assertEqual(response.json(), {'error': "Invalid start datetime"})
+
+    def test_naive_dates_are_accepted(self):
+        response = self.client.get('/api/analytics/engagement/', {'start': '2024-02-01T00:00:00', 'end': '2024-03-01'})
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(ROLLUP_MARGIN_SECONDS=60)
+class RollupTests(TestCase):
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com', password='x')
+        self.voters = [
+            CustomUser.objects.create_user(username=f'voter{i}', email=f'voter{i}@example.com', password='x')
+            for i in range(3)
+        ]
+        self.page = DeparturePage.objects.create(
+            user=self.author, title='Page', content='Goodbye', template_id='classic', is_public=True
+        )
+        self.now = timezone.now()
+
+    def vote(self, voter, days_ago):
+        return Vote.objects.create(departure_page=self.page, user=voter, created_at=self.now - timedelta(days=days_ago))
+
+    def daily_votes(self):
+        rollups = EngagementRollup.objects.filter(granularity=EngagementRollup.DAY).order_by('bucket_start')
+        return [(rollup.bucket_start.date(), rollup.votes) for rollup in rollups]
+
+    def day(self, days_ago):
+        return (self.now - timedelta(days=days_ago)).astimezone(dt_timezone.utc).date()
+
+    def test_incremental_runs_only_add_new_events(self):
+        self.vote(self.voters[0], 3)
+        run_rollup(until=self.now - timedelta(days=2))
+        self.assertEqual(self.daily_votes(), [(self.day(3), 1)])
+
+        self.vote(self.voters[1], 1)
+        since, _, _ = run_rollup(until=self.now)
+        self.assertEqual(since, self.now - timedelta(days=2))
+        self.assertEqual(self.daily_votes(), [(self.day(3), 1), (self.day(1), 1)])
+
+    def test_reruns_are_idempotent(self):
+        self.vote(self.voters[0], 3)
+        self.vote(self.voters[1], 1)
+        run_rollup(until=self.now)
+        expected = self.daily_votes()
+        run_rollup(until=self.now)
+        run_rollup(backfill=True, until=self.now)
+        self.assertEqual(self.daily_votes(), expected)
+        self.assertEqual(EngagementRollup.objects.filter(granularity=EngagementRollup.HOUR).count(), 2)
+
+    def test_backdated_and_deleted_votes_are_rolled_up_again(self):
+        self.vote(self.voters[0], 1)
+        run_rollup(until=self.now)
+
+        late = self.vote(self.voters[1], 2)
+        run_rollup(until=self.now)
+        self.assertEqual(self.daily_votes(), [(self.day(2), 1), (self.day(1), 1)])
+
+        late.delete()
+        run_rollup(until=self.now)
+        self.assertEqual(self.daily_votes(), [(self.day(1), 1)])
+
+    def test_imported_events_are_rolled_up(self):
+        run_rollup(until=self.now)
+        vote = {'type': 'vote', 'id': str(uuid.uuid4()), 'departure_page_id': str(self.page.pk),
+                'user_id': str(self.voters[2].pk), 'created_at': (self.now - timedelta(days=5)).isoformat()}
+        NDJSONImporter().run([json.dumps(vote)])
+        run_rollup(until=self.now)
+        self.assertEqual(self.daily_votes(), [(self.day(5), 1)])
+
+    def test_current_events_leave_the_watermark_alone(self):
+        run_rollup(until=self.now)
+        self.vote(self.voters[0], 0)
+        self.assertEqual(RollupWatermark.objects.get(name=WATERMARK_NAME).value, self.now)
+
+
+class TransferTests(TestCase):
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com', password='x')
+        self.reader = CustomUser.objects.create_user(username='reader', email='reader@example.com', password='x')
+        self.staff = CustomUser.objects.create_user(
+            username='staff', email='staff@example.com', password='x', is_staff=True
+        )
+        self.page = DeparturePage.objects.create(
+            user=self.author, title='Page', content='Goodbye', template_id='classic', is_public=True,
+            design_data={'font': 'mono'},
+        )
+        self.reading = EphemeralReading.objects.create(
+            departure_page=self.page, viewer=self.reader, viewer_ip='203.0.113.7', has_been_viewed=True,
+            viewer_key=viewer_key_for_user(self.reader.pk), view_date=timezone.now(),
+        )
+        self.vote = Vote.objects.create(departure_page=self.page, user=self.reader)
+        self.client = APIClient()
+
+    def export(self, user, include='readings,votes'):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/pages/export/', {'include': include})
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_round_trip(self):
+        records = self.export(self.staff)
+        self.assertEqual([record['type'] for record in records], ['page', 'reading', 'vote'])
+        DeparturePage.all_objects.all().delete()
+
+        counts = NDJSONImporter().run(json.dumps(record) for record in records)
+        self.assertEqual(counts, {'page': 1, 'reading': 1, 'vote': 1})
+        page = DeparturePage.objects.get(pk=self.page.pk)
+        self.assertEqual((page.user, page.title, page.design_data), (self.author, 'Page', {'font': 'mono'}))
+        reading = EphemeralReading.objects.get(pk=self.reading.pk)
+        self.assertEqual(
+            (reading.viewer, reading.viewer_ip, reading.viewer_key, reading.view_date),
+            (self.reader, '203.0.113.7', self.reading.viewer_key, self.reading.view_date),
+        )
+        vote = Vote.objects.get(pk=self.vote.pk)
+        self.assertEqual((vote.user, vote.created_at), (self.reader, self.vote.created_at))
+
+    def test_authors_do_not_export_their_readers(self):
+        reading = self.export(self.author)[1]
+        self.assertEqual(reading['type'], 'reading')
+        self.assertFalse({'viewer_id', 'viewer_ip', 'viewer_key'} & set(reading))
+        self.assertEqual(self.export(self.reader), [])
+
+    def test_unknown_includes_are_rejected(self):
+        self.client.force_authenticate(self.staff)
+        for include in ('readingsss', 'reading', 'readings,comments'):
+            response = self.client.get('/api/pages/export/', {'include': include})
+            self.assertEqual(response.status_code, 400, include)
+        self.assertEqual([record['type'] for record in self.export(self.staff, 'votes,votes')], ['page', 'vote'])
+
+    def test_dangling_references_fail_on_their_line(self):
+        records = self.export(self.staff)
+        DeparturePage.all_objects.all().delete()
+        lines = [json.dumps(record) for record in records]
+
+        missing_page = dict(records[2], id=str(uuid.uuid4()), departure_page_id=str(uuid.uuid4()))
+        with self.assertRaises(TransferError) as raised:
+            NDJSONImporter().run(lines + [json.dumps(missing_page)])
+        self.assertEqual(raised.exception.line_number, 4)
+        self.assertFalse(DeparturePage.objects.exists())
+
+        missing_viewer = dict(records[1], viewer_id=str(uuid.uuid4()))
+        with self.assertRaises(TransferError) as raised:
+            NDJSONImporter(batch_size=1).run([lines[0], json.dumps(missing_viewer)])
+        self.assertEqual(raised.exception.line_number, 2)
+        # Batches before the failing one are committed.
+        self.assertTrue(DeparturePage.objects.filter(pk=self.page.pk).exists())
+
+
+@override_settings(DESIGN_TEMPLATES={
+    'classic': {'color': 'red', 'font': 'serif', 'size': 12, 'border': None},
+    'modern': {'color': 'blue', 'font': 'sans', 'size': 14, 'blur': 0},
+})
+class DesignDataTests(TestCase):
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def create(self, design_data, template_id='classic'):
+        return self.client.post('/api/pages/', {
+            'title': 'Page', 'content': 'Goodbye', 'template_id': template_id, 'design_data': design_data,
+        }, format='json')
+
+    def stored(self, page_id):
+        return DeparturePage.objects.get(pk=page_id).design_data
+
+    def test_invalid_designs_are_rejected(self):
+        for design_data, error in (
+            (['red'], "Design data must be a JSON object."),
+            ({'shadow': True}, "'shadow' is not a design setting of template 'classic'."),
+            ({'size': 'large'}, "'size' must be of type int."),
+        ):
+            response = self.create(design_data)
+            self.assertEqual(response.status_code, 400, design_data)
+            self.assertEqual(response.json()['design_data'], [error])
+        with override_settings(DESIGN_DATA_MAX_BYTES=16):
+            response = self.create({'font': 'a rather long font name'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(DeparturePage.objects.exists())
+
+    def test_only_overrides_are_stored(self):
+        response = self.create({'color': 'red', 'font': 'mono', 'size': 12, 'border': '1px'})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['design_data'], {'color': 'red', 'font': 'mono', 'size': 12, 'border': '1px'})
+        page_id = response.json()['id']
+        self.assertEqual(self.stored(page_id), {'font': 'mono', 'border': '1px'})
+        self.assertEqual(
+            self.client.get(f'/api/pages/{page_id}/').json()['design_data'],
+            {'color': 'red', 'font': 'mono', 'size': 12, 'border': '1px'},
+        )
+
+    def test_changing_template_keeps_the_design(self):
+        page_id = self.create({'color': 'red', 'font': 'mono', 'size': 14}).json()['id']
+        response = self.client.patch(f'/api/pages/{page_id}/', {'template_id': 'modern'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        # Defaults of classic the page kept, red and 12, are now overrides.
+        self.assertEqual(response.json()['design_data'], {'color': 'red', 'font': 'mono', 'size': 14, 'blur': 0})
+        self.assertEqual(self.stored(page_id), {'color': 'red', 'font': 'mono'})
+
+    def test_changing_template_checks_the_overrides(self):
+        page_id = self.create({'border': '1px'}).json()['id']
+        response = self.client.patch(f'/api/pages/{page_id}/', {'template_id': 'modern'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['design_data'], ["'border' is not a design setting of template 'modern'."])
+        self.assertEqual(DeparturePage.objects.get(pk=page_id).template_id, 'classic')
+
+
+class CompressedJSONFieldTests(TestCase):
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com', password='x')
+
+    def round_trip(self, design_data):
+        page = DeparturePage.objects.create(
+            user=self.author, title='Page', content='Goodbye', template_id='classic', design_data=design_data
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT design_data FROM {DeparturePage._meta.db_table} WHERE id = %s',
+                [DeparturePage._meta.pk.get_db_prep_value(page.pk, connection)],
+            )
+            raw = bytes(cursor.fetchone()[0])
+        return raw, DeparturePage.objects.get(pk=page.pk).design_data
+
+    @override_settings(DESIGN_DATA_COMPRESS_MIN_BYTES=1024)
+    def test_small_values_are_plain_json(self):
+        design_data = {'font': 'mono', 'title': 'Adieu, café ☕', 'sizes': [1, 2.5, None]}
+        raw, value = self.round_trip(design_data)
+        self.assertEqual(value, design_data)
+        self.assertEqual(json.loads(raw), design_data)
+
+    @override_settings(DESIGN_DATA_COMPRESS_MIN_BYTES=1024)
+    def test_large_values_are_compressed(self):
+        design_data = {'blocks': [{'text': 'So long', 'index': i} for i in range(200)]}
+        raw, value = self.round_trip(design_data)
+        self.assertEqual(value, design_data)
+        self.assertTrue(raw.startswith(COMPRESSED_MAGIC))
+        self.assertLess(len(raw), len(encode_json(design_data)))
+
+    def test_legacy_json_text_is_read(self):
+        field = DeparturePage._meta.get_field('design_data')
+        self.assertEqual(field.to_python('{"font": "mono"}'), {'font': 'mono'})
+        self.assertEqual(field.to_python(memoryview(b'{"font": "mono"}')), {'font': 'mono'})
+        self.assertIsNone(field.to_python(b''))
+
+
+class ReadingTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        viewers._seen_readings = None
+        self.addCleanup(setattr, viewers, '_seen_readings', None)
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com', password='x')
+        self.reader = CustomUser.objects.create_user(username='reader', email='reader@example.com', password='x')
+        self.page = DeparturePage.objects.create(
+            user=self.author, title='Page', content='Goodbye', template_id='classic', is_public=True
+        )
+        self.url = f'/api/pages/{self.page.pk}/view/'
+
+    def view(self, client=None, ip='203.0.113.7'):
+        return (client or APIClient()).get(self.url, REMOTE_ADDR=ip)
+
+    def unique_viewers(self):
+        return DeparturePage.objects.with_stats().get(pk=self.page.pk).unique_viewers
+
+    @override_settings(VIEWER_BLOOM_FILTER_BITS=0)
+    def test_duplicate_insert_means_already_read(self):
+        self.assertEqual(self.view().status_code, 200)
+        with self.assertNumQueries(6):
+            # Page, failed insert with its three savepoint statements, marking no unread row.
+            self.assertEqual(self.view().status_code, 403)
+        self.assertEqual(EphemeralReading.objects.count(), 1)
+
+    @override_settings(VIEWER_BLOOM_FILTER_BITS=1 << 12)
+    def test_prefilter_skips_the_failing_insert(self):
+        self.assertEqual(self.view().status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.view().status_code, 403)
+        self.assertFalse([query for query in ctx.captured_queries if query['sql'].startswith('INSERT')])
+        self.assertEqual(EphemeralReading.objects.count(), 1)
+
+    @override_settings(VIEWER_BLOOM_FILTER_BITS=1 << 12)
+    def test_prefilter_false_positive_still_records(self):
+        seen_readings().add(f'{self.page.pk}:{viewer_key_for_ip("203.0.113.7")}')
+        self.assertEqual(self.view().status_code, 200)
+        self.assertEqual(self.view().status_code, 403)
+        self.assertEqual(EphemeralReading.objects.count(), 1)
+
+    def test_signed_in_reader_is_one_viewer_on_any_address(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        self.assertEqual(self.view(client, ip='203.0.113.7').status_code, 200)
+        self.assertEqual(self.view(client, ip='198.51.100.2').status_code, 403)
+        self.assertEqual(self.unique_viewers(), 1)
+
+    @override_settings(VIEWER_KEY_USE_COOKIE=True)
+    def test_cookie_tells_readers_behind_one_address_apart(self):
+        first, second = APIClient(), APIClient()
+        response = self.view(first)
+        self.assertEqual(response.status_code, 200)
+        cookie = response.cookies[VIEWER_TOKEN_COOKIE]
+        self.assertTrue(cookie['httponly'])
+        self.assertEqual(self.view(first).status_code, 403)
+        self.assertEqual(self.view(second).status_code, 200)
+        self.assertEqual(self.unique_viewers(), 2)
+
+        tampered = APIClient()
+        tampered.cookies[VIEWER_TOKEN_COOKIE] = cookie.value[:-1] + ('A' if cookie.value[-1] != 'A' else 'B')
+        response = self.view(tampered)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.cookies[VIEWER_TOKEN_COOKIE].value, cookie.value)
+        self.assertEqual(self.unique_viewers(), 3)
+
+    def test_without_cookie_one_address_is_one_reader(self):
+        self.assertEqual(self.view().status_code, 200)
+        self.assertEqual(self.view().status_code, 403)
+        self.assertEqual(self.view(ip='198.51.100.2').status_code, 200)
+        self.assertEqual(self.unique_viewers(), 2)
+
+
+class GCRATests(TestCase):
+    """Three requests a minute: a burst of three, then one every 20 seconds."""
+    interval, period = 20.0, 60.0
+
+    def assert_pattern(self, store):
+        update = lambda now: store.update('client', now, self.interval, self.period)
+        self.assertEqual([update(0)[0] for _ in range(3)], [True, True, True])
+        self.assertEqual(update(0), (False, 20.0))
+        self.assertEqual(update(15), (False, 5.0))
+        self.assertEqual(update(20), (True, 0))
+        self.assertFalse(update(21)[0])
+        # Idle for a full period: the whole burst is available again.
+        self.assertEqual([update(200)[0] for _ in range(4)], [True, True, True, False])
+
+    def test_memory_store(self):
+        self.assert_pattern(MemoryStore())
+
+    def test_cache_store(self):
+        self.assert_pattern(CacheStore(LocMemCache('gcra-tests', {})))
+
+    def test_locked_key_lets_the_request_through(self):
+        cache = LocMemCache('gcra-tests', {})
+        store = CacheStore(cache)
+        for _ in range(3):
+            store.update('client', 0, self.interval, self.period)
+        cache.add('client:lock', 1, 60)
+        self.assertEqual(store.update('client', 0, self.interval, self.period), (True, 0))
+
+    def test_memory_store_drops_least_recently_updated(self):
+        store = MemoryStore()
+        store.max_keys = 3
+        for key in ('a', 'b', 'c'):
+            store.update(key, 0, self.interval, self.period)
+        store.update('a', 1, self.interval, self.period)
+        store.update('d', 2, self.interval, self.period)
+        self.assertEqual(list(store.data), ['c', 'a', 'd'])
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'page_view': '2/min', 'vote': '1/min', 'chat': '1/min'},
+})
+class ThrottleTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com', password='x')
+        self.voter = CustomUser.objects.create_user(username='voter', email='voter@example.com', password='x')
+        self.pages = [
+            DeparturePage.objects.create(
+                user=self.author, title=f'Page {i}', content='Goodbye', template_id='classic', is_public=True
+            )
+            for i in range(2)
+        ]
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def test_retry_after(self):
+        client = APIClient()
+        for page in self.pages:
+            self.assertEqual(client.get(f'/api/pages/{page.pk}/view/').status_code, 200)
+        response = client.get(f'/api/pages/{self.pages[0].pk}/view/')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(int(response['Retry-After']), (29, 30))
+        # Another address has its own allowance.
+        self.assertEqual(client.get(f'/api/pages/{self.pages[0].pk}/view/', REMOTE_ADDR='198.51.100.2').status_code, 200)
+
+    def test_throttled_before_authentication(self):
+        client = self.client_for(self.voter)
+        self.assertEqual(client.post(f'/api/pages/{self.pages[0].pk}/vote/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = client.post(f'/api/pages/{self.pages[1].pk}/vote/')
+        self.assertEqual(response.status_code, 429)
+
+        # Keyed on the token's user, not the shared address.
+        other = self.client_for(self.author)
+        self.assertEqual(other.post(f'/api/pages/{self.pages[1].pk}/vote/').status_code, 200)
+
+
+class ConditionalETagMiddlewareTests(TestCase):
+
+    def respond(self, method='GET', if_none_match=None, status=200, etag='W/"page-3"'):
+        def get_response(request):
+            response = HttpResponse('body', status=status)
+            if etag:
+                response['ETag'] = etag
+            response['Cache-Control'] = 'private, max-age=0'
+            return response
+
+        headers = {'HTTP_IF_NONE_MATCH': if_none_match} if if_none_match else {}
+        request = RequestFactory().generic(method, '/api/pages/', **headers)
+        return ConditionalETagMiddleware(get_response)(request)
+
+    def test_matching_etag_is_not_modified(self):
+        for if_none_match in ('W/"page-3"', '"page-3"', 'W/"page-2", W/"page-3"', '*'):
+            response = self.respond(if_none_match=if_none_match)
+            self.assertEqual(response.status_code, 304, if_none_match)
+            self.assertEqual(response['ETag'], 'W/"page-3"')
+            self.assertEqual(response['Cache-Control'], 'private, max-age=0')
+            self.assertEqual(response.content, b'')
+
+    def test_other_responses_pass_through(self):
+        self.assertEqual(self.respond(if_none_match='W/"page-2"').status_code, 200)
+        self.assertEqual(self.respond().status_code, 200)
+        self.assertEqual(self.respond('POST', if_none_match='W/"page-3"').status_code, 200)
+        self.assertEqual(self.respond(if_none_match='W/"page-3"', status=404).status_code, 404)
+        self.assertEqual(self.respond(if_none_match='*', etag=None).status_code, 200)
+
+
+class PageListETagTests(TestCase):
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com', password='x')
+        self.voter = CustomUser.objects.create_user(username='voter', email='voter@example.com', password='x')
+        self.pages = [
+            DeparturePage.objects.create(
+                user=self.author, title=f'Page {i}', content='Goodbye', template_id='classic', is_public=True
+            )
+            for i in range(3)
+        ]
+        self.client = APIClient()
+
+    def etag(self, **params):
+        response = self.client.get('/api/pages/', params)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_unchanged_list_is_not_loaded(self):
+        etag = self.etag()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/pages/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_changes_move_the_etag(self):
+        etags = [self.etag()]
+        Vote.objects.create(departure_page=self.pages[0], user=self.voter)
+        etags.append(self.etag())
+        page = DeparturePage.objects.get(pk=self.pages[1].pk)
+        page.title = 'Renamed'
+        page.save()
+        etags.append(self.etag())
+        page.is_public = False
+        page.save()
+        etags.append(self.etag())
+        DeparturePage.objects.get(pk=self.pages[2].pk).soft_delete()
+        etags.append(self.etag())
+        self.assertEqual(len(set(etags)), len(etags))
+
+    def test_parameters_are_part_of_the_etag(self):
+        etag = self.etag()
+        self.assertNotEqual(self.etag(search='Page 1'), etag)
+        self.assertNotEqual(self.etag(ordering='title'), etag)
+        self.assertEqual(self.etag(), etag)
+
+
+def use_temporary_storages(testcase):
+    """Point the default and snapshot storages at directories removed after the test."""
+    media, snapshots = tempfile.mkdtemp(), tempfile.mkdtemp()
+    testcase.addCleanup(shutil.rmtree, media, ignore_errors=True)
+    testcase.addCleanup(shutil.rmtree, snapshots, ignore_errors=True)
+    overrides = override_settings(MEDIA_ROOT=media, STORAGES={
+        **settings.STORAGES,
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': media}},
+        'snapshots': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': snapshots, 'base_url': '/api/snapshots/'},
+        },
+    })
+    overrides.enable()
+    testcase.addCleanup(overrides.disable)
+    return media, snapshots
+
+
+class ReaperTests(TestCase):
+
+    def setUp(self):
+        self.media, _ = use_temporary_storages(self)
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com', password='x')
+        self.readers = [
+            CustomUser.objects.create_user(username=f'reader{i}', email=f'reader{i}@example.com', password='x')
+            for i in range(2)
+        ]
+
+    def page_with_activity(self, title):
+        page = DeparturePage.objects.create(user=self.author, title=title, content='Goodbye', template_id='classic')
+        page.image.save(f'{title}.png', ContentFile(b'\x89PNG'), save=False)
+        DeparturePage.all_objects.filter(pk=page.pk).update(image=page.image.name)
+        for reader in self.readers:
+            EphemeralReading.objects.create(
+                departure_page=page, viewer=reader, viewer_key=viewer_key_for_user(reader.pk),
+                has_been_viewed=True, view_date=timezone.now(),
+            )
+            Vote.objects.create(departure_page=page, user=reader)
+        EngagementRollup.objects.create(
+            granularity=EngagementRollup.DAY, bucket_start=timezone.now(), departure_page=page,
+            ending_type=page.ending_type, tone=page.tone, views=2, votes=2,
+        )
+        return DeparturePage.objects.get(pk=page.pk)
+
+    def test_reaps_soft_deleted_pages_and_what_hangs_off_them(self):
+        deleted, kept = self.page_with_activity('deleted'), self.page_with_activity('kept')
+        image = os.path.join(self.media, deleted.image.name)
+        self.assertTrue(os.path.exists(image))
+        deleted.soft_delete()
+
+        totals = reap_deleted_pages(batch_size=1)
+        self.assertEqual(totals, {'pages': 1, 'readings': 2, 'votes': 2, 'rollups': 1})
+        self.assertFalse(DeparturePage.all_objects.filter(pk=deleted.pk).exists())
+        self.assertFalse(EphemeralReading.objects.filter(departure_page_id=deleted.pk).exists())
+        self.assertFalse(Vote.objects.filter(departure_page_id=deleted.pk).exists())
+        self.assertFalse(os.path.exists(image))
+        # Sync still reports the deletion.
+        self.assertTrue(DeparturePageTombstone.objects.filter(page_id=deleted.pk).exists())
+
+        self.assertEqual(EphemeralReading.objects.filter(departure_page=kept).count(), 2)
+        self.assertEqual(Vote.objects.filter(departure_page=kept).count(), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.media, kept.image.name)))
+        self.assertEqual(reaper_backlog()['pending_pages'], 0)
+
+    def test_grace_and_max_pages(self):
+        for title in ('first', 'second'):
+            self.page_with_activity(title).soft_delete()
+        self.assertEqual(reap_deleted_pages(grace=timedelta(hours=1))['pages'], 0)
+        backlog = reaper_backlog()
+        self.assertEqual((backlog['pending_pages'], backlog['pending_readings'], backlog['pending_votes']), (2, 4, 4))
+
+        self.assertEqual(reap_deleted_pages(max_pages=1)['pages'], 1)
+        self.assertEqual(
+            list(DeparturePage.all_objects.values_list('title', flat=True)), ['second']
+        )
+
+
+class SnapshotTests(TestCase):
+
+    def setUp(self):
+        _, self.snapshots = use_temporary_storages(self)
+        self.author = CustomUser.objects.create_user(username='author', email='author@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def create(self, **fields):
+        return DeparturePage.objects.create(
+            user=self.author, title='Page', content='Goodbye', template_id='classic',
+            **{'is_ephemeral': False, **fields}
+        )
+
+    def files(self, page):
+        directory = os.path.join(self.snapshots, str(page.pk))
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def publish(self, page):
+        self.assertEqual(self.client.post(f'/api/pages/{page.pk}/publish/').status_code, 200)
+        page.refresh_from_db()
+        return page
+
+    def test_publishing_writes_the_snapshot(self):
+        page = self.publish(self.create())
+        self.assertTrue(page.snapshot_hash)
+        self.assertEqual(page.snapshot_version, page.version)
+        self.assertEqual(self.files(page), [f'{page.snapshot_hash}.html', f'{page.snapshot_hash}.json'])
+
+        share_url = self.client.post(f'/api/pages/{page.pk}/share/').json()['share_url']
+        self.assertTrue(share_url.endswith(f'/api/snapshots/{page.pk}/{page.snapshot_hash}.html'))
+        response = APIClient().get(f'/api/snapshots/{page.pk}/{page.snapshot_hash}.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['title'], 'Page')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_ephemeral_pages_get_no_snapshot(self):
+        page = self.publish(self.create(is_ephemeral=True))
+        self.assertEqual((page.snapshot_hash, self.files(page)), ('', []))
+        share_url = self.client.post(f'/api/pages/{page.pk}/share/').json()['share_url']
+        self.assertTrue(share_url.endswith(f'/api/pages/{page.pk}/'))
+
+    def test_edits_replace_the_snapshot(self):
+        page = self.publish(self.create())
+        old_hash = page.snapshot_hash
+        self.client.patch(f'/api/pages/{page.pk}/', {'title': 'Renamed'}, format='json')
+        self.client.post(f'/api/pages/{page.pk}/share/')
+        page.refresh_from_db()
+        self.assertNotEqual(page.snapshot_hash, old_hash)
+        self.assertEqual(self.files(page), [f'{page.snapshot_hash}.html', f'{page.snapshot_hash}.json'])
+
+        response = APIClient().get(f'/api/snapshots/{page.pk}/{old_hash}.html')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], f'/api/snapshots/{page.pk}/{page.snapshot_hash}.html')
+
+    def test_unpublishing_withdraws_the_snapshot(self):
+        page = self.publish(self.create())
+        digest = page.snapshot_hash
+        self.assertEqual(
+            self.client.patch(f'/api/pages/{page.pk}/', {'is_public': False}, format='json').status_code, 200
+        )
+        page.refresh_from_db()
+        self.assertEqual((page.snapshot_hash, self.files(page)), ('', []))
+        self.assertEqual(APIClient().get(f'/api/snapshots/{page.pk}/{digest}.html').status_code, 404)
+
+    def test_deleting_withdraws_the_snapshot(self):
+        page = self.publish(self.create())
+        self.assertEqual(self.client.delete(f'/api/pages/{page.pk}/').status_code, 204)
+        self.assertEqual(self.files(page), [])
+        self.assertEqual(DeparturePage.all_objects.get(pk=page.pk).snapshot_hash, '')
+
+    def test_refresh_catches_up(self):
+        stale = self.create(is_public=True)
+        withdrawn = self.publish(self.create())
+        DeparturePage.objects.filter(pk=withdrawn.pk).update(is_public=False)
+        self.assertEqual(refresh_snapshots(), (1, 1))
+        stale.refresh_from_db()
+        self.assertEqual(len(self.files(stale)), 2)
+        self.assertEqual(self.files(withdrawn), [])
+        self.assertEqual(refresh_snapshots(), (0, 0))
+
+
+class PageVisibilityTests(TestCase):
+    """A private page is invisible to everyone but its owner, on every endpoint."""
+    endpoints = (
+        ('get', '/api/pages/{}/'),
+        ('get', '/api/pages/{}/view/'),
+        ('post', '/api/pages/{}/vote/'),
+        ('post', '/api/pages/{}/publish/'),
+        ('post', '/api/pages/{}/share/'),
+        ('patch', '/api/pages/{}/'),
+        ('delete', '/api/pages/{}/'),
+    )
+
+    def setUp(self):
+        caches['default'].clear()
+        self.owner = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='x')
+        self.other = CustomUser.objects.create_user(username='other', email='other@example.com', password='x')
+        self.page = DeparturePage.objects.create(
+            user=self.owner, title='Private', content='Goodbye', template_id='classic', is_public=False
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def request(self, client, method, url, page_id):
+        return getattr(client, method)(url.format(page_id), {'title': 'Changed'}, format='json')
+
+    def test_other_users_get_404(self):
+        client = self.client_for(self.other)
+        for method, url in self.endpoints:
+            with self.subTest(method=method, url=url), self.assertNumQueries(1):
+                self.assertEqual(self.request(client, method, url, self.page.pk).status_code, 404)
+        self.assertEqual(DeparturePage.objects.get(pk=self.page.pk).title, 'Private')
+
+    def test_anonymous_users_cannot_tell_it_exists(self):
+        client = self.client_for(None)
+        for method, url in self.endpoints:
+            with self.subTest(method=method, url=url):
+                response = self.request(client, method, url, self.page.pk)
+                missing = self.request(client, method, url, uuid.uuid4())
+                self.assertIn(response.status_code, (401, 404))
+                self.assertEqual(response.status_code, missing.status_code)
+        self.assertEqual(self.request(client, 'get', '/api/pages/{}/', self.page.pk).status_code, 404)
+        self.assertEqual(self.request(client, 'get', '/api/pages/{}/view/', self.page.pk).status_code, 404)
+        self.assertFalse(EphemeralReading.objects.exists())
+
+    def test_owner_still_has_access(self):
+        client = self.client_for(self.owner)
+        for method, url in self.endpoints[:-1]:
+            # Publishing makes it public: every endpoint starts from a private page.
+            DeparturePage.objects.filter(pk=self.page.pk).update(is_public=False)
+            with self.subTest(method=method, url=url):
+                self.assertEqual(self.request(client, method, url, self.page.pk).status_code, 200)
+        self.assertEqual(self.request(client, 'delete', '/api/pages/{}/', self.page.pk).status_code, 204)
+
+    def test_public_pages_stay_readable(self):
+        DeparturePage.objects.filter(pk=self.page.pk).update(is_public=True)
+        for user in (None, self.other):
+            self.assertEqual(self.request(self.client_for(user), 'get', '/api/pages/{}/', self.page.pk).status_code, 200)
+        self.assertEqual(
+            self.request(self.client_for(self.other), 'post', '/api/pages/{}/publish/', self.page.pk).status_code, 403
+        )
+
+
+@override_settings(PROFILING_CACHE_ALIAS='default', PROFILING_SLOW_REQUEST_MS=500, PROFILING_BUFFER_SIZE=5)
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        profiling.config.data, profiling.config.checked_at = None, float('-inf')
+        self.staff = CustomUser.objects.create_user(
+            username='staff', email='staff@example.com', password='x', is_staff=True
+        )
+        DeparturePage.objects.create(
+            user=self.staff, title='Page', content='Goodbye', template_id='classic', is_public=True
+        )
+
+    def list_pages(self, elapsed):
+        with mock.patch.object(profiling.RequestTrace, 'elapsed', return_value=elapsed):
+            self.assertEqual(APIClient().get('/api/pages/').status_code, 200)
+
+    def download(self, **params):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        return client.get('/api/maintenance/profiling/captures/', params)
+
+    def test_slow_requests_are_captured(self):
+        self.list_pages(elapsed=0.1)
+        self.assertEqual(profiling.list_captures(), [])
+
+        self.list_pages(elapsed=0.6)
+        [capture] = profiling.list_captures()
+        self.assertEqual(
+            (capture['reason'], capture['url_name'], capture['status'], capture['duration_ms']),
+            ('slow', 'departurepage-list', 200, 600.0),
+        )
+        self.assertTrue(capture['path'].endswith('/api/pages/'))
+        self.assertEqual(capture['query_count'], len(capture['queries']))
+        self.assertIn('app_departurepage', capture['queries'][-1]['sql'])
+
+    def test_download(self):
+        self.list_pages(elapsed=0.6)
+        [capture] = profiling.list_captures()
+        capture.update(id=uuid.uuid4().hex, stacks={'app.views:get;app.views:slow': 3})
+        profiling.save_capture(capture)
+        self.list_pages(elapsed=0.6)
+
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(self.download(id=capture['id']).json()[0]['stacks'], capture['stacks'])
+        self.assertEqual(self.download(id='missing').status_code, 404)
+
+        folded = self.download(output='folded')
+        self.assertEqual(folded['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(folded.content.decode(), 'app.views:get;app.views:slow 3\n')
+
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_user(username='user', email='user@example.com'))
+        self.assertEqual(client.get('/api/maintenance/profiling/captures/').status_code, 403)
+
+    def test_ring_buffer_keeps_the_latest(self):
+        for _ in range(7):
+            self.list_pages(elapsed=0.6)
+        self.assertEqual(len(profiling.list_captures()), 5)
+
+
+class StackSamplerTests(TestCase):
+
+    def test_samples_slow_requests_without_being_woken(self):
+        sampler = profiling.StackSampler(interval=0.005, sample_after=0.05)
+        sampler.start()
+        time.sleep(0.01)
+        release = threading.Event()
+
+        def slow_request(trace):
+            trace.thread_id = threading.get_ident()
+            sampler.add(trace)
+            release.wait(5)
+            sampler.remove(trace)
+
+        trace = profiling.RequestTrace()
+        worker = threading.Thread(target=slow_request, args=(trace,))
+        worker.start()
+        time.sleep(0.3)
+        release.set()
+        worker.join()
+        self.assertFalse(sampler.wakeup.is_set())
+        self.assertTrue(any('slow_request' in stack for stack in trace.stacks), trace.stacks)
+
+    def test_does_not_sample_fast_requests(self):
+        sampler = profiling.StackSampler(interval=0.005, sample_after=10)
+        sampler.start()
+        trace = profiling.RequestTrace()
+        sampler.add(trace)
+        time.sleep(0.05)
+        sampler.remove(trace)
+        self.assertEqual(trace.stacks, Counter())
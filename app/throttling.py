@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .viewers import get_client_ip
+
+logger = logging.getLogger(__name__)
+
+
+def gcra(tat, now, interval, period):
+    """
+    One step of the generic cell rate algorithm: (new_tat, 0) when a
+    request arriving at `now` conforms, (None, seconds to wait) otherwise.
+    """
+    tat = max(tat or now, now)
+    allow_at = tat + interval - period
+    if now < allow_at:
+        return None, allow_at - now
+    return tat + interval, 0
+
+
+class MemoryStore:
+    """
+    Per-process store, used when the shared cache is unreachable. Updates
+    are serialized by a lock, but each worker only sees its own traffic.
+    Holds at most max_keys clients, dropping the least recently updated.
+    """
+    max_keys = 100000
+
+    def __init__(self):
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def update(self, key, now, interval, period):
+        with self.lock:
+            entry = self.data.get(key)
+            tat = entry[0] if entry is not None and entry[1] >= now else None
+            new_tat, wait = gcra(tat, now, interval, period)
+            if new_tat is not None:
+                self.data[key] = (new_tat, new_tat + 1)
+                self.data.move_to_end(key)
+                while len(self.data) > self.max_keys:
+                    self.data.popitem(last=False)
+            return new_tat is not None, wait
+
+
+memory_store = MemoryStore()
+
+# GCRA as a single atomic Redis command; times travel as strings because
+# Lua numbers are truncated to integers on the way back.
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+if tat < now then tat = now end
+local allow_at = tat + interval - period
+if now < allow_at then
+    return {0, tostring(allow_at - now)}
+end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], tostring(new_tat), 'EX', math.ceil(new_tat - now) + 1)
+return {1, '0'}
+"""
+
+
+class CacheStore:
+    """
+    GCRA state in a Django cache shared by all workers. On Redis the update
+    runs as one Lua script; on other backends the read-modify-write is
+    guarded by a lock key taken with cache.add(). A request that cannot get
+    the lock is let through unthrottled: the contention comes from the same
+    client's concurrent requests, which are not abuse by themselves.
+    """
+    lock_timeout = 2
+    lock_attempts = 3
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def update(self, key, now, interval, period):
+        if isinstance(self.cache, RedisCache):
+            return self.update_redis(key, now, interval, period)
+
+        lock_key = f'{key}:lock'
+        for attempt in range(self.lock_attempts):
+            if self.cache.add(lock_key, 1, self.lock_timeout):
+                break
+            time.sleep(0.001 * (attempt + 1))
+        else:
+            logger.debug("Throttle key %s stayed locked, letting the request through", key)
+            return True, 0
+        try:
+            new_tat, wait = gcra(self.cache.get(key), now, interval, period)
+            if new_tat is not None:
+                self.cache.set(key, new_tat, int(new_tat - now) + 1)
+            return new_tat is not None, wait
+        finally:
+            self.cache.delete(lock_key)
+
+    def update_redis(self, key, now, interval, period):
+        key = self.cache.make_and_validate_key(key)
+        client = self.cache._cache.get_client(key, write=True)
+        allowed, wait = client.register_script(GCRA_SCRIPT)(keys=[key], args=[repr(now), repr(interval), repr(period)])
+        return bool(allowed), float(wait)
+
+
+def get_store():
+    alias = getattr(settings, 'THROTTLE_CACHE_ALIAS', None)
+    return CacheStore(caches[alias]) if alias else memory_store
+
+
+def parse_rate(rate):
+    """'100/min' -> (100, 60), same format as DRF's throttle rates."""
+    num, period = rate.split('/')
+    return int(num), {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+
+
+class GCRAThrottle(BaseThrottle):
+    """
+    Generic cell rate algorithm throttle: a single "theoretical arrival
+    time" per client allows `num` requests in a burst and then one every
+    period/num seconds, with no fixed-window edge effects. The state lives
+    in THROTTLE_CACHE_ALIAS and is updated atomically, so concurrent
+    requests cannot all pass on the same reading.
+
+    The rate comes from DEFAULT_THROTTLE_RATES under the view's
+    throttle_scope. Clients are keyed on the user id read from the JWT,
+    without a database lookup, or on the trusted client IP.
+    """
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if rate is None:
+            return True
+
+        num, period = parse_rate(rate)
+        interval = period / num
+        key = f'throttle:{scope}:{self.get_ident(request)}'
+        now = time.time()
+
+        try:
+            allowed, wait = get_store().update(key, now, interval, period)
+        except Exception:
+            logger.warning("Throttle store unavailable, falling back to memory", exc_info=True)
+            allowed, wait = memory_store.update(key, now, interval, period)
+
+        if not allowed:
+            self.wait_seconds = wait
+        return allowed
+
+    def get_ident(self, request):
+        user_id = self.get_token_user_id(request)
+        if user_id is not None:
+            return f'user:{user_id}'
+        return f'ip:{get_client_ip(request)}'
+
+    def get_token_user_id(self, request):
+        authenticator = JWTAuthentication()
+        header = authenticator.get_header(request)
+        raw_token = authenticator.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            token = authenticator.get_validated_token(raw_token)
+        except (InvalidToken, TokenError):
+            return None
+        return token.get(jwt_settings.USER_ID_CLAIM)
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class ThrottleFirstMixin:
+    """
+    Check throttles before authenticating, so a rejected request never costs
+    the user lookup. Throttles must therefore not rely on request.user.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().check_throttles(request)
+        self.throttles_checked = True
+        super().initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        if not getattr(self, 'throttles_checked', False):
+            super().check_throttles(request)
@@ -0,0 +1,226 @@
+import datetime
+import json
+import time
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .design import upgrade_design
+from .models import CustomUser, DeparturePage, EphemeralReading, RollupWatermark, Vote
+from .serializers import DeparturePageCreateSerializer
+from .viewers import viewer_key_for_ip, viewer_key_for_user
+
+PAGE = 'page'
+READING = 'reading'
+VOTE = 'vote'
+
+PAGE_FIELDS = (
+    'id', 'user_id', 'title', 'content', 'design_data', 'design_version', 'template_id',
+    'creation_date', 'is_public', 'is_anonymous', 'is_ephemeral',
+    'ending_type', 'tone', 'votes_count', 'image'
+)
+READING_FIELDS = ('id', 'departure_page_id', 'viewer_id', 'has_been_viewed', 'view_date', 'viewer_ip', 'viewer_key')
+# Who read a page: only exported for staff, never to the page's author.
+# viewer_key is a stable pseudonym that would link a reader across pages.
+READER_FIELDS = ('viewer_id', 'viewer_ip', 'viewer_key')
+VOTE_FIELDS = ('id', 'departure_page_id', 'user_id', 'created_at')
+
+RELATED_EXPORTS = {
+    READING: (EphemeralReading, READING_FIELDS),
+    VOTE: (Vote, VOTE_FIELDS),
+}
+
+
+class TransferError(Exception):
+    def __init__(self, line_number, errors):
+        self.line_number = line_number
+        self.errors = errors
+        super().__init__(f"Line {line_number}: {errors}")
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    """Keeps the microseconds DjangoJSONEncoder drops, so imported timestamps match the exported ones."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _dumps(record_type, row):
+    return json.dumps({'type': record_type, **row}, cls=ExportEncoder) + '\n'
+
+
+def keyset_rows(queryset, fields, chunk_size):
+    """
+    Yield queryset rows as dicts of fields, in pk order, one bounded query
+    per chunk_size rows. MySQL's driver buffers a whole result set even with
+    iterator(), so that is what keeps memory flat on large exports.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk.values('pk', *fields)[:chunk_size])
+        for row in rows:
+            last_pk = row.pop('pk')
+            yield row
+        if len(rows) < chunk_size:
+            return
+
+
+def export_ndjson(pages, include=(), chunk_size=2000, exclude_fields=()):
+    """
+    Yield the given pages, then their readings and votes if requested, as
+    NDJSON lines, leaving out exclude_fields. Rows are read chunk_size at a
+    time.
+    """
+    for row in keyset_rows(pages, PAGE_FIELDS, chunk_size):
+        yield _dumps(PAGE, row)
+
+    for record_type in include:
+        model, fields = RELATED_EXPORTS[record_type]
+        fields = [field for field in fields if field not in exclude_fields]
+        related = model.objects.filter(departure_page__in=pages.order_by().values('pk'))
+        for row in keyset_rows(related, fields, chunk_size):
+            yield _dumps(record_type, row)
+
+
+class NDJSONImporter:
+    """
+    Load NDJSON produced by export_ndjson. Pages are validated with
+    DeparturePageCreateSerializer and the pages and users rows point at are
+    checked to exist; rows are inserted with bulk_create, one transaction
+    per batch.
+    """
+
+    def __init__(self, owner=None, batch_size=1000, ignore_conflicts=False):
+        self.owner = owner
+        self.batch_size = batch_size
+        self.ignore_conflicts = ignore_conflicts
+        self.pending = {PAGE: [], READING: [], VOTE: []}
+        self.counts = {PAGE: 0, READING: 0, VOTE: 0}
+        self.started = None
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.monotonic() - self.started if self.started else 0
+        return self.total / elapsed if elapsed else 0.0
+
+    def run(self, lines, progress=None):
+        self.started = time.monotonic()
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise TransferError(line_number, str(e))
+            self.add(line_number, record)
+            if sum(len(rows) for rows in self.pending.values()) >= self.batch_size:
+                self.flush()
+                if progress:
+                    progress(self)
+        self.flush()
+        return self.counts
+
+    def add(self, line_number, record):
+        record_type = record.pop('type', None)
+        if record_type == PAGE:
+            self.pending[PAGE].append((line_number, self.build_page(line_number, record)))
+        elif record_type == READING:
+            reading = EphemeralReading(**{field: record.get(field) for field in READING_FIELDS})
+            if record.get('view_date'):
+                reading.view_date = parse_datetime(record['view_date'])
+            if not reading.viewer_key:
+                # Exports older than viewer_key: derive it as the view endpoint would.
+                if reading.viewer_id:
+                    reading.viewer_key = viewer_key_for_user(reading.viewer_id)
+                elif reading.viewer_ip:
+                    reading.viewer_key = viewer_key_for_ip(reading.viewer_ip)
+            self.pending[READING].append((line_number, reading))
+        elif record_type == VOTE:
+            vote = Vote(**{field: record.get(field) for field in VOTE_FIELDS if field != 'created_at'})
+            if record.get('created_at'):
+                vote.created_at = parse_datetime(record['created_at'])
+            self.pending[VOTE].append((line_number, vote))
+        else:
+            raise TransferError(line_number, f"Unknown record type: {record_type}")
+
+    def build_page(self, line_number, record):
+        image = record.pop('image', None)
+        if 'design_data' in record:
+            record['design_data'] = upgrade_design(record['design_data'], record.pop('design_version', 1))
+        serializer = DeparturePageCreateSerializer(data=record)
+        if not serializer.is_valid():
+            raise TransferError(line_number, serializer.errors)
+
+        page = DeparturePage(**serializer.validated_data)
+        if record.get('id'):
+            page.id = record['id']
+        if record.get('creation_date'):
+            page.creation_date = parse_datetime(record['creation_date'])
+        page.user_id = self.owner.pk if self.owner else record.get('user_id')
+        if page.user_id is None:
+            raise TransferError(line_number, "Page has no owner; pass one explicitly")
+        page.image = image or None
+        return page
+
+    def references(self):
+        """Yield (line_number, kind, id) for every page or user a pending row points at."""
+        for line_number, page in self.pending[PAGE]:
+            yield line_number, 'user', page.user_id
+        for line_number, reading in self.pending[READING]:
+            yield line_number, 'page', reading.departure_page_id
+            if reading.viewer_id:
+                yield line_number, 'user', reading.viewer_id
+        for line_number, vote in self.pending[VOTE]:
+            yield line_number, 'page', vote.departure_page_id
+            yield line_number, 'user', vote.user_id
+
+    def check_references(self):
+        """
+        Raise TransferError on the first pending row pointing at a page or
+        user that is neither in the database nor in this batch, rather than
+        let bulk_create fail on the foreign key without a line number.
+        """
+        references = []
+        for line_number, kind, value in self.references():
+            try:
+                references.append((line_number, kind, uuid.UUID(str(value))))
+            except ValueError:
+                raise TransferError(line_number, f"Invalid {kind} id: {value}")
+
+        known = {'page': {uuid.UUID(str(page.pk)) for _, page in self.pending[PAGE]}, 'user': set()}
+        for kind, model in (('page', DeparturePage.all_objects), ('user', CustomUser.objects)):
+            wanted = {value for _, ref_kind, value in references if ref_kind == kind} - known[kind]
+            if wanted:
+                known[kind] |= set(model.filter(pk__in=wanted).values_list('pk', flat=True))
+        for line_number, kind, value in sorted(references, key=lambda reference: reference[0]):
+            if value not in known[kind]:
+                raise TransferError(line_number, f"Unknown {kind}: {value}")
+
+    def flush(self):
+        self.check_references()
+        with transaction.atomic():
+            for record_type, model in ((PAGE, DeparturePage), (READING, EphemeralReading), (VOTE, Vote)):
+                rows = [row for _, row in self.pending[record_type]]
+                if rows:
+                    model.objects.bulk_create(rows, batch_size=self.batch_size, ignore_conflicts=self.ignore_conflicts)
+            # Imported readings and votes are usually older than the last
+            # engagement rollup, which has to go over them again.
+            event_times = [reading.view_date for _, reading in self.pending[READING] if reading.has_been_viewed]
+            event_times += [vote.created_at for _, vote in self.pending[VOTE]]
+            event_times = [value for value in event_times if value is not None]
+            if event_times:
+                RollupWatermark.rewind_for(min(event_times))
+        for record_type, rows in self.pending.items():
+            self.counts[record_type] += len(rows)
+            self.pending[record_type] = []
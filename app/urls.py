@@ -9,11 +9,20 @@ urlpatterns = [
     path('users/me/', views.CurrentUserView.as_view(), name='current-user'),
     
     path('pages/', views.DeparturePageListView.as_view(), name='departurepage-list'),
+    path('pages/export/', views.DeparturePageExportView.as_view(), name='departurepage-export'),
+    path('pages/sync/', views.DeparturePageSyncView.as_view(), name='departurepage-sync'),
+    path('pages/mine/', views.MyDeparturePagesView.as_view(), name='departurepage-mine'),
     path('pages/<uuid:pk>/', views.DeparturePageDetailView.as_view(), name='departurepage-detail'),
     path('pages/<uuid:pk>/publish/', views.DeparturePagePublishView.as_view(), name='departurepage-publish'),
     path('pages/<uuid:pk>/share/', views.DeparturePageShareView.as_view(), name='departurepage-share'),
     path('pages/<uuid:pk>/view/', views.DeparturePageViewReadingView.as_view(), name='departurepage-view'),
     path('pages/<uuid:pk>/vote/', views.VoteView.as_view(), name='departure-page-vote'),
-    
+    path('snapshots/<uuid:pk>/<slug:digest>.<slug:fmt>', views.SnapshotFileView.as_view(), name='page-snapshot'),
+
+    path('analytics/engagement/', views.EngagementAnalyticsView.as_view(), name='engagement-analytics'),
+    path('maintenance/reaper/', views.ReaperStatusView.as_view(), name='reaper-status'),
+    path('maintenance/profiling/', views.ProfilingView.as_view(), name='profiling'),
+    path('maintenance/profiling/captures/', views.ProfileDownloadView.as_view(), name='profiling-captures'),
+
     path('chat/mistral/', views.MistralChatAPI.as_view(), name='mistral-chat'),
 ]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -0,0 +1,109 @@
+import hashlib
+import ipaddress
+import threading
+import uuid
+
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+
+VIEWER_TOKEN_COOKIE = 'viewer_token'
+VIEWER_TOKEN_SALT = 'app.viewers.token'
+VIEWER_TOKEN_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def get_client_ip(request):
+    """
+    Client address as seen by the last trusted proxy. With
+    TRUSTED_PROXY_COUNT proxies in front of Django, X-Forwarded-For is read
+    from the right so a client cannot spoof its address by prepending
+    entries; without proxies REMOTE_ADDR is authoritative.
+    """
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    if proxies:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            candidate = forwarded[-proxies]
+            try:
+                return str(ipaddress.ip_address(candidate))
+            except ValueError:
+                pass
+    return request.META.get('REMOTE_ADDR') or None
+
+
+def _hash(value):
+    return salted_hmac(
+        'app.viewers.viewer_key', value,
+        secret=getattr(settings, 'VIEWER_KEY_SALT', None) or settings.SECRET_KEY,
+        algorithm='sha256',
+    ).hexdigest()
+
+
+def viewer_key_for_user(user_id):
+    return _hash(f'user:{user_id}')
+
+
+def viewer_key_for_ip(ip_address, token=None):
+    return _hash(f'ip:{ip_address}:{token or ""}')
+
+
+def get_viewer_token(request):
+    """The signed viewer_token cookie, or None when absent or tampered with."""
+    return request.get_signed_cookie(
+        VIEWER_TOKEN_COOKIE, default=None, salt=VIEWER_TOKEN_SALT, max_age=VIEWER_TOKEN_MAX_AGE
+    )
+
+
+def new_viewer_token():
+    return uuid.uuid4().hex
+
+
+def set_viewer_token(response, token):
+    response.set_signed_cookie(
+        VIEWER_TOKEN_COOKIE, token, salt=VIEWER_TOKEN_SALT, max_age=VIEWER_TOKEN_MAX_AGE,
+        httponly=True, samesite='Lax', secure=not settings.DEBUG,
+    )
+
+
+class BloomFilter:
+    """
+    Fixed-size in-memory Bloom filter. It never forgets an added item but may
+    report unseen items as seen; it starts over once it holds `capacity`
+    items, to keep the false positive rate bounded.
+    """
+
+    def __init__(self, bits, hashes=4, capacity=None):
+        self.bits = bits
+        self.hashes = hashes
+        self.capacity = capacity or bits // 10
+        self.count = 0
+        self.array = bytearray((bits + 7) // 8)
+        self.lock = threading.Lock()
+
+    def _positions(self, item):
+        digest = hashlib.sha256(item.encode('utf-8')).digest()
+        for i in range(self.hashes):
+            yield int.from_bytes(digest[i * 4:i * 4 + 4], 'big') % self.bits
+
+    def __contains__(self, item):
+        return all(self.array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def add(self, item):
+        with self.lock:
+            if self.count >= self.capacity:
+                self.array = bytearray(len(self.array))
+                self.count = 0
+            for pos in self._positions(item):
+                self.array[pos >> 3] |= 1 << (pos & 7)
+            self.count += 1
+
+
+_seen_readings = None
+
+
+def seen_readings():
+    """Process-wide prefilter of (page, viewer_key) pairs, None when disabled."""
+    global _seen_readings
+    bits = getattr(settings, 'VIEWER_BLOOM_FILTER_BITS', 0)
+    if bits and _seen_readings is None:
+        _seen_readings = BloomFilter(bits)
+    return _seen_readings
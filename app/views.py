@@ -1,19 +1,55 @@
 import os
+from datetime import timedelta
 from django.conf import settings
-import requests
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 from django.utils import timezone
-from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q, Sum
 from django.shortcuts import get_object_or_404
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.core.exceptions import ValidationError
 
-from .models import CustomUser, DeparturePage, EphemeralReading, Vote
+from .analytics import engagement_series
+from .models import (
+    CustomUser, DeparturePage, DeparturePageTombstone, EngagementRollup, EphemeralReading, Vote
+)
 from .serializers import (
-    CustomUserDetailsSerializer, DeparturePageSerializer, DeparturePageCreateSerializer
+    CustomUserDetailsSerializer, DeparturePageSerializer, DeparturePageCreateSerializer,
+    DeparturePageStatsSerializer
 )
+from .conditional import etag_matches, row_digest, weak_etag
+from .design import template_defaults
 from .permissions import IsOwnerOrReadOnly
+from .profiling import config as profiling_config
+from .profiling import cache_is_shared, folded_stacks, get_capture, list_captures
+from .reaper import reaper_backlog
+from .snapshots import get_storage as get_snapshot_storage
+from .snapshots import is_snapshotable, snapshot_name, snapshot_url, withdraw_snapshots, write_snapshot
+from .throttling import GCRAThrottle, ThrottleFirstMixin
+from .transfer import READER_FIELDS, READING, VOTE, export_ndjson
+from .viewers import (
+    get_client_ip, get_viewer_token, new_viewer_token, seen_readings, set_viewer_token,
+    viewer_key_for_ip, viewer_key_for_user
+)
+
+
+def page_etag(page):
+    """
+    Weak ETag of a page from its id and version, without rendering it. The
+    author and the template defaults are rendered too but do not bump the
+    version, so they are part of the tag.
+    """
+    author = None if page.is_anonymous else (page.user.username, page.user.email)
+    return weak_etag(page.id, page.version, row_digest(author, template_defaults(page.template_id)))
+
+
+def serializable_pages(*extra_fields):
+    """Pages queryset loading exactly what DeparturePageSerializer renders."""
+    return DeparturePageSerializer.setup_eager_loading(DeparturePage.objects.all(), *extra_fields)
 
 
 class UserListView(ListAPIView):
@@ -54,14 +90,22 @@ class DeparturePageListView(APIView):
             )
         
         ordering = request.query_params.get('ordering')
+
+        # Every change to a listed page bumps its version and updated_at, so
+        # one aggregate query tells whether the list changed without
+        # loading it.
+        stamp = queryset.aggregate(count=Count('pk'), last=Max('updated_at'), versions=Sum('version'))
+        etag = weak_etag('pages', stamp['count'], row_digest(stamp['last'], stamp['versions'], search, ordering))
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
         if ordering:
             queryset = queryset.order_by(ordering)
         else:
             queryset = queryset.order_by('-creation_date')
         
-        limited_data = queryset.values('id', 'title', 'votes_count', 'tone')
-        
-        return Response(limited_data)
+        limited_data = list(queryset.values('id', 'title', 'votes_count', 'tone'))
+        return Response(limited_data, headers={'ETag': etag})
     
     def post(self, request):
         serializer = DeparturePageCreateSerializer(data=request.data)
@@ -72,26 +116,156 @@ class DeparturePageListView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class MyDeparturePagesView(ListAPIView):
+    """Dashboard of the current user's pages with their engagement stats."""
+    serializer_class = DeparturePageStatsSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        stats = DeparturePageStatsSerializer._declared_fields
+        fields = [name for name in DeparturePageStatsSerializer.Meta.fields if name not in stats]
+        return (
+            DeparturePage.objects.filter(user=self.request.user)
+            .only(*fields)
+            .with_stats()
+            .order_by('-creation_date')
+        )
+
+
+class DeparturePageExportView(APIView):
+    """
+    Stream pages as NDJSON, with ?include=readings,votes for related rows.
+    Staff export every page, other users only their own, without who read
+    them.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    include_names = {'readings': READING, 'votes': VOTE}
+
+    def get(self, request):
+        names = [name for name in request.query_params.get('include', '').split(',') if name]
+        unknown = [name for name in names if name not in self.include_names]
+        if unknown:
+            return Response({'error': f"Cannot include: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+        include = [self.include_names[name] for name in dict.fromkeys(names)]
+
+        pages = DeparturePage.objects.all()
+        exclude_fields = ()
+        if not request.user.is_staff:
+            pages = pages.filter(user=request.user)
+            exclude_fields = READER_FIELDS
+
+        response = StreamingHttpResponse(
+            export_ndjson(pages, include=include, exclude_fields=exclude_fields), content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = 'attachment; filename="departure-pages.ndjson"'
+        return response
+
+
+class DeparturePageSyncView(APIView):
+    """
+    Delta sync: pages changed and ids of pages gone since ?since=<datetime>.
+    ?scope=mine (default) follows the user's own pages, ?scope=public the
+    public feed. Pass the returned `until` as the next `since`; while
+    `has_more` is true, call again right away.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_limit = 500
+
+    def get(self, request):
+        scope = request.query_params.get('scope', 'mine')
+        if scope not in ('mine', 'public'):
+            return Response({'error': f"Unsupported scope: {scope}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        since = None
+        if request.query_params.get('since'):
+            try:
+                since = parse_datetime(request.query_params['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                return Response({'error': "Invalid since datetime"}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', self.max_limit)), self.max_limit))
+        except ValueError:
+            return Response({'error': "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        retention = timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+        if since is not None and since < now - retention:
+            # Deletions that old are no longer tracked: start over.
+            since = None
+
+        # updated_at is stamped before the writer commits: rows younger than
+        # the margin are left for the next sync, so that none committed late
+        # with an older timestamp is skipped.
+        until = now - timedelta(seconds=getattr(settings, 'SYNC_CURSOR_MARGIN_SECONDS', 10))
+        if scope == 'mine':
+            pages = serializable_pages().filter(user=request.user)
+            tombstones = DeparturePageTombstone.objects.filter(user_id=request.user.pk, unpublished=False)
+        else:
+            pages = serializable_pages().filter(is_public=True)
+            tombstones = DeparturePageTombstone.objects.filter(was_public=True)
+        pages = pages.filter(updated_at__lt=until)
+
+        deleted = []
+        if since is not None:
+            pages = pages.filter(updated_at__gte=since)
+            deleted = list(
+                tombstones.filter(deleted_at__gte=since, deleted_at__lt=until).values_list('page_id', flat=True).distinct()
+            )
+            if scope == 'public' and deleted:
+                # Made private, then public again.
+                republished = set(DeparturePage.objects.filter(pk__in=deleted, is_public=True).values_list('pk', flat=True))
+                deleted = [page_id for page_id in deleted if page_id not in republished]
+
+        changed = list(pages.order_by('updated_at', 'id')[:limit + 1])
+        has_more = len(changed) > limit
+        if has_more:
+            changed = changed[:limit]
+            until = changed[-1].updated_at
+
+        return Response({
+            'since': since,
+            'until': until,
+            'full_resync': since is None,
+            'has_more': has_more,
+            'changed': DeparturePageSerializer(changed, many=True).data,
+            'deleted': deleted,
+        })
+
+
 class DeparturePageDetailView(APIView):
 
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     
     def get_object(self, pk):
         """Get the departure page object"""
-        page = get_object_or_404(DeparturePage, pk=pk)
+        page = get_object_or_404(serializable_pages('snapshot_hash').visible_to(self.request.user), pk=pk)
         self.check_object_permissions(self.request, page)
         return page
+
+    def withdraw_snapshot(self, page):
+        """A page that may no longer be shared loses its snapshot now, not at the next build_snapshots run."""
+        if page.snapshot_hash and (page.deleted_at or not is_snapshotable(page)):
+            withdraw_snapshots(page.pk)
     
     def get(self, request, pk):
         page = self.get_object(pk)
+        etag = page_etag(page)
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
         serializer = DeparturePageSerializer(page)
-        return Response(serializer.data)
+        return Response(serializer.data, headers={'ETag': etag})
     
     def put(self, request, pk):
         page = self.get_object(pk)
         serializer = DeparturePageSerializer(page, data=request.data)
         if serializer.is_valid():
             serializer.save()
+            self.withdraw_snapshot(page)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -100,12 +274,14 @@ class DeparturePageDetailView(APIView):
         serializer = DeparturePageSerializer(page, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            self.withdraw_snapshot(page)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def delete(self, request, pk):
         page = self.get_object(pk)
-        page.delete()
+        page.soft_delete()
+        self.withdraw_snapshot(page)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -114,11 +290,13 @@ class DeparturePagePublishView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
     
     def post(self, request, pk):
-        page = get_object_or_404(DeparturePage, pk=pk)
+        page = get_object_or_404(DeparturePage.objects.visible_to(request.user), pk=pk)
         self.check_object_permissions(request, page)
         
         page.is_public = True
         page.save()
+        if is_snapshotable(page):
+            write_snapshot(get_object_or_404(serializable_pages('snapshot_hash', 'snapshot_version'), pk=pk))
         return Response({'status': 'page published'})
 
 
@@ -126,10 +304,16 @@ class DeparturePageShareView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
     
     def post(self, request, pk):
-        page = get_object_or_404(DeparturePage, pk=pk)
+        page = get_object_or_404(DeparturePage.objects.visible_to(request.user), pk=pk)
         self.check_object_permissions(request, page)
 
-        share_url = request.build_absolute_uri(f'/api/pages/{page.id}/')
+        if is_snapshotable(page):
+            if page.snapshot_version != page.version:
+                write_snapshot(get_object_or_404(serializable_pages('snapshot_hash', 'snapshot_version'), pk=pk))
+                page.refresh_from_db(fields=['snapshot_hash'])
+            share_url = request.build_absolute_uri(snapshot_url(page))
+        else:
+            share_url = request.build_absolute_uri(f'/api/pages/{page.id}/')
         
         return Response({
             'status': 'page shared',
@@ -137,55 +321,130 @@ class DeparturePageShareView(APIView):
         })
 
 
-class DeparturePageViewReadingView(APIView):
+class SnapshotFileView(APIView):
+    """
+    Serves share snapshots when the snapshot storage has no public URL of its
+    own. Snapshot files never change, so a CDN in front of this view fetches
+    each one once.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    content_types = {
+        'html': 'text/html; charset=utf-8',
+        'json': 'application/json',
+    }
+
+    def get(self, request, pk, digest, fmt):
+        if fmt not in self.content_types:
+            raise Http404
+        try:
+            snapshot = get_snapshot_storage().open(snapshot_name(pk, digest, fmt))
+        except FileNotFoundError:
+            return self.redirect_to_current(pk, fmt)
+        with snapshot:
+            response = HttpResponse(snapshot.read(), content_type=self.content_types[fmt])
+        max_age = getattr(settings, 'SNAPSHOT_CACHE_MAX_AGE', 365 * 24 * 60 * 60)
+        response['Cache-Control'] = f'public, max-age={max_age}, immutable'
+        return response
+
+    def redirect_to_current(self, pk, fmt):
+        """Links to a superseded snapshot lead to the current one, for as long as the page is shared."""
+        page = (
+            DeparturePage.objects.filter(pk=pk, is_public=True, is_ephemeral=False)
+            .exclude(snapshot_hash='').only('pk', 'snapshot_hash').first()
+        )
+        if page is None:
+            raise Http404
+        response = HttpResponseRedirect(get_snapshot_storage().url(snapshot_name(pk, page.snapshot_hash, fmt)))
+        response['Cache-Control'] = 'public, max-age=60'
+        return response
+
+
+class DeparturePageViewReadingView(ThrottleFirstMixin, APIView):
 
     permission_classes = [permissions.AllowAny]  # Allow anonymous access
+    throttle_classes = [GCRAThrottle]
+    throttle_scope = 'page_view'
     
     def get(self, request, pk):
-        page = get_object_or_404(DeparturePage, pk=pk)
-        ip_address = request.META.get('REMOTE_ADDR') or request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0]
-        print(f"{ip_address} ooo")
+        page = get_object_or_404(serializable_pages().visible_to(request.user), pk=pk)
+        ip_address = get_client_ip(request)
+        token = None
         if request.user.is_authenticated:
-            user = request.user
-            
-            reading, created = EphemeralReading.objects.get_or_create(
-                departure_page=page,
-                viewer=user,
-                defaults={'has_been_viewed': False}
-            )
-            
-            if reading.has_been_viewed:
-                return Response({
-                    'error': 'This page has already been viewed and cannot be viewed again'
-                }, status=status.HTTP_403_FORBIDDEN)
+            viewer = request.user
+            viewer_key = viewer_key_for_user(viewer.pk)
         else:
-            ip_address = request.META.get('REMOTE_ADDR') or request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0]
-            print(ip_address)
-            reading, created = EphemeralReading.objects.get_or_create(
-                departure_page=page,
-                viewer=None,
-                viewer_ip=ip_address,
-                defaults={'has_been_viewed': False}
-            )
-            
-            if reading.has_been_viewed:
-                return Response({
-                    'error': 'This page has already been viewed and cannot be viewed again'
-                }, status=status.HTTP_403_FORBIDDEN)
-        
-        reading.has_been_viewed = True
-        reading.view_date = timezone.now()
-        reading.save()
-        
+            viewer = None
+            if getattr(settings, 'VIEWER_KEY_USE_COOKIE', False):
+                token = get_viewer_token(request) or new_viewer_token()
+            viewer_key = viewer_key_for_ip(ip_address, token)
+
+        if not self.record_reading(page, viewer, viewer_key, ip_address):
+            return Response({
+                'error': 'This page has already been viewed and cannot be viewed again'
+            }, status=status.HTTP_403_FORBIDDEN)
+
         serializer = DeparturePageSerializer(page)
-        return Response(serializer.data)
-    
-class VoteView(APIView):
+        response = Response(serializer.data)
+        if token:
+            set_viewer_token(response, token)
+        return response
+
+    def record_reading(self, page, viewer, viewer_key, ip_address):
+        """
+        Mark the page as read by this viewer and return False if it already
+        was. A first view is a single insert against the unique
+        (departure_page, viewer_key) index; the in-memory prefilter lets
+        repeat views skip straight to a lookup instead of a failing insert.
+        """
+        now = timezone.now()
+        seen = seen_readings()
+        seen_key = f'{page.pk}:{viewer_key}'
+        readings = EphemeralReading.objects.filter(departure_page=page, viewer_key=viewer_key)
+
+        if seen is not None and seen_key in seen:
+            viewed = readings.values_list('has_been_viewed', flat=True).first()
+            if viewed is None:
+                return self.create_reading(page, viewer, viewer_key, ip_address, now)
+            if viewed:
+                return False
+        else:
+            if seen is not None:
+                seen.add(seen_key)
+            if self.create_reading(page, viewer, viewer_key, ip_address, now):
+                return True
+
+        if viewer is not None:
+            readings = EphemeralReading.objects.filter(Q(viewer_key=viewer_key) | Q(viewer=viewer), departure_page=page)
+        return readings.filter(has_been_viewed=False).update(
+            has_been_viewed=True, view_date=now, viewer_key=viewer_key
+        ) > 0
+
+    def create_reading(self, page, viewer, viewer_key, ip_address, now):
+        try:
+            with transaction.atomic():
+                EphemeralReading.objects.create(
+                    departure_page=page,
+                    viewer=viewer,
+                    viewer_key=viewer_key,
+                    viewer_ip=ip_address,
+                    has_been_viewed=True,
+                    view_date=now,
+                )
+        except IntegrityError:
+            return False
+        return True
+
+
+class VoteView(ThrottleFirstMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [GCRAThrottle]
+    throttle_scope = 'vote'
     
     def post(self, request, pk):
 
-        departure_page = get_object_or_404(DeparturePage, pk=pk)
+        departure_page = get_object_or_404(serializable_pages('votes_count').visible_to(request.user), pk=pk)
         
         existing_vote = Vote.objects.filter(
             departure_page=departure_page,
@@ -206,7 +465,7 @@ class VoteView(APIView):
     
     def delete(self, request, pk):
 
-        departure_page = get_object_or_404(DeparturePage, pk=pk)
+        departure_page = get_object_or_404(serializable_pages('votes_count').visible_to(request.user), pk=pk)
         
         vote = Vote.objects.filter(
             departure_page=departure_page,
@@ -219,15 +478,144 @@ class VoteView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        vote.departure_page = departure_page
         vote.delete()
         
         serializer = DeparturePageSerializer(departure_page, context={'request': request})
         return Response(serializer.data)
     
 
-class MistralChatAPI(APIView):
+class EngagementAnalyticsView(APIView):
+    """
+    Views and votes over time, served from the engagement rollups. Staff see
+    every page, other users only their own.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    group_by_fields = ('ending_type', 'tone')
+
+    def get(self, request):
+        params = request.query_params
+        granularity = params.get('granularity', EngagementRollup.DAY)
+        if granularity not in dict(EngagementRollup.GRANULARITY_CHOICES):
+            return Response({'error': f"Unsupported granularity: {granularity}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = params.get('group_by')
+        if group_by and group_by not in self.group_by_fields:
+            return Response({'error': f"Unsupported group_by: {group_by}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = EngagementRollup.objects.all()
+        if not request.user.is_staff:
+            queryset = queryset.filter(departure_page__user=request.user)
+
+        for param, lookup in (('start', 'bucket_start__gte'), ('end', 'bucket_start__lt')):
+            if params.get(param):
+                try:
+                    value = parse_datetime(params[param])
+                except ValueError:
+                    value = None
+                if value is None:
+                    return Response({'error': f"Invalid {param} datetime"}, status=status.HTTP_400_BAD_REQUEST)
+                if timezone.is_naive(value):
+                    value = timezone.make_aware(value)
+                queryset = queryset.filter(**{lookup: value})
+
+        try:
+            for param, lookup in (('page', 'departure_page_id'), ('ending_type', 'ending_type'), ('tone', 'tone')):
+                if params.get(param):
+                    queryset = queryset.filter(**{lookup: params[param]})
+        except ValidationError:
+            return Response({'error': "Invalid page id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        series = engagement_series(queryset, granularity, group_by)
+        return Response({'granularity': granularity, 'results': list(series)})
+
+
+class ReaperStatusView(APIView):
+    """Progress of the deleted pages reaper, for staff monitoring."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(reaper_backlog())
+
+
+class ProfilingView(APIView):
+    """
+    Staff toggle of the request profiler. POST {"sample_rate": <percent>,
+    "url_name": <name>, "duration": <seconds>} to profile that share of
+    requests and/or every request to that URL name; DELETE switches it off.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    max_duration = 60 * 60
+
+    def get(self, request):
+        captures = [
+            {key: value for key, value in capture.items() if key not in ('queries', 'stacks')}
+            for capture in list_captures()
+        ]
+        return Response({
+            'config': profiling_config.get(),
+            'slow_request_ms': getattr(settings, 'PROFILING_SLOW_REQUEST_MS', 0),
+            **self.cache_warning(),
+            'captures': captures,
+        })
+
+    def cache_warning(self):
+        if cache_is_shared():
+            return {}
+        return {'warning': "PROFILING_CACHE_ALIAS is a per-process cache: this toggle and these captures only concern the worker that answered."}
+
+    def post(self, request):
+        try:
+            sample_rate = float(request.data.get('sample_rate', 0))
+            duration = int(request.data.get('duration', 600))
+        except (TypeError, ValueError):
+            return Response({'error': "sample_rate and duration must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+        url_name = request.data.get('url_name') or None
+        if not 0 <= sample_rate <= 100:
+            return Response({'error': "sample_rate is a percentage"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < duration <= self.max_duration:
+            return Response({'error': f"duration must be between 1 and {self.max_duration} seconds"}, status=status.HTTP_400_BAD_REQUEST)
+        if not sample_rate and not url_name:
+            return Response({'error': "Set sample_rate or url_name"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'config': profiling_config.set(sample_rate, url_name, duration), **self.cache_warning()})
+
+    def delete(self, request):
+        profiling_config.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ProfileDownloadView(APIView):
+    """
+    Download captured requests, all of them or ?id=<capture id>: JSON with
+    SQL traces by default, or ?output=folded for their merged stack samples
+    in collapsed format, ready for flamegraph.pl or speedscope.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        capture_id = request.query_params.get('id')
+        if capture_id:
+            capture = get_capture(capture_id)
+            if capture is None:
+                raise Http404
+            captures = [capture]
+        else:
+            captures = list_captures()
+
+        if request.query_params.get('output') == 'folded':
+            response = HttpResponse(folded_stacks(captures), content_type='text/plain; charset=utf-8')
+            response['Content-Disposition'] = 'attachment; filename="stacks.folded"'
+            return response
+        response = Response(captures)
+        response['Content-Disposition'] = 'attachment; filename="request-captures.json"'
+        return response
+
+
+class MistralChatAPI(ThrottleFirstMixin, APIView):
 
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [GCRAThrottle]
+    throttle_scope = 'chat'
     
     def post(self, request):
         messages = request.data.get('messages', [])
@@ -298,6 +686,8 @@ class MistralChatAPI(APIView):
             raise ValueError(f"Unsupported language: {language}")
 
     def query_huggingface_api(self, prompt, api_key):
+        import requests
+
         api_url = "https://router.huggingface.co/together/v1/chat/completions"
         headers = {
             "Authorization": f"Bearer {api_key}",
@@ -0,0 +1,110 @@
+import re
+import threading
+import time
+
+from django.conf import settings
+
+# requests and google.auth are imported on first use to keep worker boot light.
+
+GOOGLE_ISSUERS = ['accounts.google.com', 'https://accounts.google.com']
+DEFAULT_TOKEN_URL = 'https://oauth2.googleapis.com/token'
+DEFAULT_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+DEFAULT_CERTS_MAX_AGE = 3600
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide requests session so Google connections are pooled and reused."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=getattr(settings, 'GOOGLE_OAUTH_POOL_SIZE', 20))
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def _timeout():
+    return getattr(settings, 'GOOGLE_OAUTH_TIMEOUT', (3.05, 10))
+
+
+def exchange_code(code):
+    """Trade an authorization code for Google's token response."""
+    return get_session().post(
+        getattr(settings, 'GOOGLE_OAUTH_TOKEN_URL', DEFAULT_TOKEN_URL),
+        data={
+            'code': code,
+            'client_id': settings.GOOGLE_OAUTH_CLIENT_ID,
+            'client_secret': settings.GOOGLE_OAUTH_CLIENT_SECRET,
+            'redirect_uri': settings.GOOGLE_OAUTH_CALLBACK_URL,
+            'grant_type': 'authorization_code'
+        },
+        timeout=_timeout(),
+    )
+
+
+def _max_age(cache_control):
+    match = re.search(r'max-age=(\d+)', cache_control or '')
+    return int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE
+
+
+class GoogleCertsCache:
+    """
+    Google's signing certificates, kept in memory until the max-age Google
+    sends with them runs out. Concurrent refreshes are collapsed: one thread
+    fetches while the others wait for its result.
+    """
+
+    def __init__(self):
+        self.certs = {}
+        self.expires_at = 0
+        self.lock = threading.Lock()
+
+    def get(self, force=False):
+        if not force and self.certs and time.monotonic() < self.expires_at:
+            return self.certs
+        stale = self.expires_at
+        with self.lock:
+            # Another thread refreshed while we were waiting for the lock.
+            if self.expires_at != stale and self.certs:
+                return self.certs
+            response = get_session().get(
+                getattr(settings, 'GOOGLE_OAUTH_CERTS_URL', DEFAULT_CERTS_URL), timeout=_timeout()
+            )
+            response.raise_for_status()
+            self.certs = response.json()
+            self.expires_at = time.monotonic() + _max_age(response.headers.get('Cache-Control'))
+            return self.certs
+
+
+certs_cache = GoogleCertsCache()
+
+
+def verify_id_token(token, audience):
+    """
+    Same checks as google.oauth2.id_token.verify_oauth2_token, against the
+    cached certificates. An unknown key id forces one refresh, as Google
+    rotates its keys.
+    """
+    from google.auth import exceptions as google_exceptions
+    from google.auth import jwt
+
+    key_id = jwt.decode_header(token).get('kid')
+    certs = certs_cache.get()
+    if key_id not in certs:
+        certs = certs_cache.get(force=True)
+
+    id_info = jwt.decode(token, certs=certs, audience=audience, clock_skew_in_seconds=10)
+    if id_info.get('iss') not in GOOGLE_ISSUERS:
+        raise google_exceptions.GoogleAuthError(
+            f"Wrong issuer. 'iss' should be one of the following: {GOOGLE_ISSUERS}"
+        )
+    return id_info
@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.test import TestCase, override_settings
+from google.auth import crypt, jwt
+from rest_framework.test import APIClient
+
+from app.models import CustomUser
+from auth.google import certs_cache
+
+KEY_ID = 'test-key'
+CLIENT_ID = 'test-client.apps.googleusercontent.com'
+
+
+def make_signing_key():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'fake-google')])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    return crypt.RSASigner.from_string(private_pem, key_id=KEY_ID), cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class FakeGoogle:
+    """Local stand-in for Google's token and certificate endpoints."""
+
+    def __init__(self):
+        self.signer, self.cert = make_signing_key()
+        self.audience = CLIENT_ID
+        self.certs_status = 200
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                fake.requests.append('token')
+                now = int(time.time())
+                id_token = jwt.encode(fake.signer, {
+                    'iss': 'https://accounts.google.com', 'aud': fake.audience, 'iat': now, 'exp': now + 3600,
+                    'email': 'ada@example.com', 'given_name': 'Ada', 'family_name': 'Lovelace',
+                }).decode()
+                self.respond(200, {'id_token': id_token})
+
+            def do_GET(self):
+                fake.requests.append('certs')
+                self.respond(fake.certs_status, {KEY_ID: fake.cert} if fake.certs_status == 200 else {})
+
+            def respond(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Cache-Control', 'public, max-age=3600')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class GoogleCallbackTests(TestCase):
+
+    def setUp(self):
+        self.google = FakeGoogle()
+        self.addCleanup(self.google.close)
+        certs_cache.certs, certs_cache.expires_at = {}, 0
+        settings = override_settings(
+            GOOGLE_OAUTH_CLIENT_ID=CLIENT_ID,
+            GOOGLE_OAUTH_CLIENT_SECRET='secret',
+            GOOGLE_OAUTH_CALLBACK_URL='http://testserver/callback',
+            GOOGLE_OAUTH_TOKEN_URL=f'{self.google.url}/token',
+            GOOGLE_OAUTH_CERTS_URL=f'{self.google.url}/certs',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def callback(self):
+        return APIClient().get('/api/auth/google/callback/', {'code': 'abc'})
+
+    def test_login_creates_user_and_caches_certs(self):
+        self.assertEqual(self.callback().status_code, 200)
+        response = self.callback()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+        self.assertEqual(CustomUser.objects.filter(email='ada@example.com').count(), 1)
+        self.assertEqual(self.google.requests, ['token', 'certs', 'token'])
+
+    def test_wrong_audience_is_rejected(self):
+        self.google.audience = 'someone-else'
+        self.assertEqual(self.callback().status_code, 400)
+        self.assertFalse(CustomUser.objects.exists())
+
+    def test_certs_failure_is_a_bad_gateway(self):
+        self.google.certs_status = 500
+        self.assertEqual(self.callback().status_code, 502)
+
+    def test_token_endpoint_unreachable_is_a_bad_gateway(self):
+        self.google.close()
+        self.assertEqual(self.callback().status_code, 502)
@@ -1,6 +1,6 @@
 from django.urls import path, re_path, include
 from django.views.generic import TemplateView
-from auth.views import CustomConfirmEmailView, GoogleAuthCallbackView, GoogleLogin
+from auth.views import CustomConfirmEmailView, GoogleAuthCallbackView
 from dj_rest_auth.views import PasswordResetConfirmView
 
 urlpatterns = [
@@ -24,6 +24,8 @@ urlpatterns = [
         name="password_reset_confirm"
     ),
     
+    # GoogleLogin lives in auth.social, which loads allauth's Google provider
+    # views: import it from there when enabling this route.
     # path("google/", GoogleLogin.as_view(), name="google_login"),
     path("google/callback/", GoogleAuthCallbackView.as_view(), name="google_login_callback"),
 ]
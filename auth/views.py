@@ -1,28 +1,15 @@
-import requests
 from urllib.parse import urljoin
-import requests as external_requests
-from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
-from allauth.socialaccount.providers.oauth2.client import OAuth2Client
 from allauth.account.views import ConfirmEmailView
-from dj_rest_auth.registration.views import SocialLoginView
-from google.auth.transport import requests as google_requests
 from django.conf import settings
 from django.urls import reverse
-from django.template.response import TemplateResponse
 from django.http import HttpResponseRedirect
-from google.oauth2 import id_token
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from app.models import CustomUser
-
-class GoogleLogin(SocialLoginView):
-    adapter_class = GoogleOAuth2Adapter
-    callback_url = settings.GOOGLE_OAUTH_CALLBACK_URL
-    client_class = OAuth2Client
-
+from app.templating import render_cached
 
 class GoogleAuthCallbackView(APIView):
     def get(self, request):
@@ -30,16 +17,13 @@ class GoogleAuthCallbackView(APIView):
         if not code:
             return Response({'error': 'No code provided'}, status=status.HTTP_400_BAD_REQUEST)
 
-        token_url = 'https://oauth2.googleapis.com/token'
-        data = {
-            'code': code,
-            'client_id': settings.GOOGLE_OAUTH_CLIENT_ID,
-            'client_secret': settings.GOOGLE_OAUTH_CLIENT_SECRET,
-            'redirect_uri': settings.GOOGLE_OAUTH_CALLBACK_URL,
-            'grant_type': 'authorization_code'
-        }
+        import requests
+        from .google import exchange_code, verify_id_token
 
-        token_response = external_requests.post(token_url, data=data)
+        try:
+            token_response = exchange_code(code)
+        except requests.exceptions.RequestException:
+            return Response({'error': 'Google token endpoint unreachable'}, status=status.HTTP_502_BAD_GATEWAY)
         if token_response.status_code != 200:
             return Response({'error': 'Failed to get token'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -47,7 +31,13 @@ class GoogleAuthCallbackView(APIView):
         id_token_str = token_data.get('id_token')
 
         try:
-            id_info = id_token.verify_oauth2_token(id_token_str, google_requests.Request(), settings.GOOGLE_CLIENT_ID)
+            id_info = verify_id_token(id_token_str, settings.GOOGLE_OAUTH_CLIENT_ID)
+        except requests.exceptions.RequestException:
+            return Response({'error': 'Google certificates unreachable'}, status=status.HTTP_502_BAD_GATEWAY)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
             email = id_info['email']
             first_name = id_info.get('given_name', '')
             last_name = id_info.get('family_name', '')
@@ -83,12 +73,14 @@ class CustomConfirmEmailView(ConfirmEmailView):
                 'confirmation': self.object,
                 'confirm_url': request.path,
             }
+            email = self.object.email_address.email
         except Exception:
             context = {
                 'confirmation': None,
                 'confirm_url': request.path,
             }
-        return TemplateResponse(request, self.get_template_names(), context)
+            email = None
+        return render_cached(request, self.template_name, context, key=(request.path, email))
 
     def post(self, request, *args, **kwargs):
         try:
@@ -100,4 +92,4 @@ class CustomConfirmEmailView(ConfirmEmailView):
                 'error': str(e),
                 'confirm_url': request.path,
             }
-            return TemplateResponse(request, self.error_template_name, context)
\ No newline at end of file
+            return render_cached(request, self.error_template_name, context, key=(request.path, str(e)))
@@ -0,0 +1,45 @@
+import gc
+import multiprocessing
+import os
+
+wsgi_app = 'theendpage.wsgi:application'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+
+# Import Django, every app and the URLconf once in the master, then fork:
+# workers start instantly and share those pages copy-on-write.
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+
+def warm_templates():
+    from django.conf import settings
+
+    if getattr(settings, 'TEMPLATE_WARMUP', False):
+        from app.templating import warm_templates
+        warm_templates()
+
+
+def when_ready(server):
+    if preload_app:
+        from django.urls import get_resolver
+        get_resolver().url_patterns
+        # Compiled once here and inherited by every worker.
+        warm_templates()
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        warm_templates()
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the GC's reach, so collections
+    # in the workers do not touch (and copy) the shared pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared between workers.
+    from django.db import connections
+    connections.close_all()
@@ -37,6 +37,9 @@ AUTH_USER_MODEL = 'app.CustomUser'
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'app.middleware.ProfilingMiddleware',
+    'app.middleware.CompressionMiddleware',
+    'app.middleware.ConditionalETagMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -46,26 +49,54 @@ MIDDLEWARE = [
     "allauth.account.middleware.AccountMiddleware",
 ]
 
+# Responses smaller than this are sent uncompressed.
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
+
 ROOT_URLCONF = 'theendpage.urls'
 FORCE_SCRIPT_NAME = '/theendpage'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / "templates"],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compiled templates are kept in memory outside DEBUG.
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+            ],
         },
     },
 ]
 
+# Compile every project template when gunicorn starts (see gunicorn.conf.py),
+# not in management commands and background workers.
+TEMPLATE_WARMUP = not DEBUG
+# Seconds a rendered page fragment stays cached, 0 to disable.
+TEMPLATE_FRAGMENT_CACHE_TIMEOUT = 0 if DEBUG else 300
+
 WSGI_APPLICATION = 'theendpage.wsgi.application'
 
+# Shared by every worker: throttle state, the profiling toggle and captures,
+# and cached template fragments.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0"),
+    }
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.mysql',
@@ -101,8 +132,51 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/document/'
 MEDIA_ROOT = BASE_DIR
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    # Immutable, content-hashed share snapshots of published pages. Set
+    # SNAPSHOT_URL to the CDN serving this directory (or swap in a bucket
+    # backend) so share traffic never reaches the app; the default URL is the
+    # app's own snapshot view, to be used as the CDN origin.
+    "snapshots": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {
+            "location": os.getenv("SNAPSHOT_ROOT", BASE_DIR / "snapshots"),
+            "base_url": os.getenv("SNAPSHOT_URL", "/theendpage/api/snapshots/"),
+        },
+    },
+}
+# max-age sent with snapshots served by the app.
+SNAPSHOT_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Departure page design data
+# Shared design defaults per template_id; pages only store their overrides.
+# The front end's templates are not registered here yet: until they are,
+# design data is only size checked and stored whole.
+DESIGN_TEMPLATES = {}
+DESIGN_DATA_MAX_BYTES = 64 * 1024
+DESIGN_DATA_COMPRESS_MIN_BYTES = 1024
+
+# Delta sync: deletions are reported for this long, older cursors get a full resync.
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+# Changes younger than this are left for the next sync, as their transaction may not have committed yet.
+SYNC_CURSOR_MARGIN_SECONDS = 10
+
+# Engagement rollups (app.analytics): events younger than this are left for the next run.
+ROLLUP_MARGIN_SECONDS = 60
+
+# Ephemeral readings
+# Number of reverse proxies in front of Django whose X-Forwarded-For entries are trusted.
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "0"))
+VIEWER_KEY_SALT = os.getenv("VIEWER_KEY_SALT")
+# Also key anonymous viewers on a signed cookie token, not just their IP.
+VIEWER_KEY_USE_COOKIE = False
+# Size in bits of the per-process "already viewed" prefilter, 0 to disable.
+VIEWER_BLOOM_FILTER_BITS = 1 << 23
+
 # CORS settings
 CORS_ALLOW_METHODS = ['DELETE', 'GET', 'OPTIONS', 'PATCH', 'POST', 'PUT']
 CORS_ALLOW_HEADERS = [
@@ -116,16 +190,46 @@ CORS_ALLOW_CREDENTIALS = True
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    # Per-view rates, looked up by each view's throttle_scope.
+    'DEFAULT_THROTTLE_RATES': {
+        'page_view': '60/min',
+        'vote': '30/min',
+        'chat': '10/min',
+    },
 }
 
+# Cache alias shared by all workers for throttle state; empty keeps it per
+# process, which multiplies every rate by the number of workers.
+THROTTLE_CACHE_ALIAS = os.getenv("THROTTLE_CACHE_ALIAS", "default") or None
+
+# Profiling and slow request capture (app.profiling)
+# Requests slower than this keep their SQL trace and stack samples, 0 to disable.
+PROFILING_SLOW_REQUEST_MS = int(os.getenv("PROFILING_SLOW_REQUEST_MS", "1000"))
+# Seconds between stack samples.
+PROFILING_SAMPLE_INTERVAL = 0.01
+# Captures kept, oldest overwritten first, and for how long.
+PROFILING_BUFFER_SIZE = 50
+PROFILING_RETENTION = 24 * 60 * 60
+# Cache holding the staff toggle and the captures; use one shared by all
+# workers, or each worker only reports its own.
+PROFILING_CACHE_ALIAS = os.getenv("PROFILING_CACHE_ALIAS", "default")
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=24),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
 
 # Email settings
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Mail is queued in the outbox and delivered by `manage.py send_queued_mail`
+# through EMAIL_DELIVERY_BACKEND.
+EMAIL_BACKEND = "app.mail.OutboxEmailBackend"
+EMAIL_DELIVERY_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+# Sent and failed messages are deleted after this many days.
+EMAIL_OUTBOX_RETENTION_DAYS = 7
+EMAIL_TIMEOUT = 10
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -167,6 +271,11 @@ ACCOUNT_ADAPTER = "auth.adapters.CustomAccountAdapter"
 GOOGLE_OAUTH_CLIENT_ID = os.getenv("GOOGLE_OAUTH_CLIENT_ID")
 GOOGLE_OAUTH_CLIENT_SECRET = os.getenv("GOOGLE_OAUTH_CLIENT_SECRET")
 GOOGLE_OAUTH_CALLBACK_URL = os.getenv("GOOGLE_OAUTH_CALLBACK_URL")
+GOOGLE_OAUTH_TOKEN_URL = os.getenv("GOOGLE_OAUTH_TOKEN_URL", "https://oauth2.googleapis.com/token")
+GOOGLE_OAUTH_CERTS_URL = os.getenv("GOOGLE_OAUTH_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+# (connect, read) timeouts in seconds for calls to Google
+GOOGLE_OAUTH_TIMEOUT = (3.05, 10)
+GOOGLE_OAUTH_POOL_SIZE = 20
 
 SOCIALACCOUNT_EMAIL_AUTHENTICATION = True
 SOCIALACCOUNT_EMAIL_AUTHENTICATION_AUTO_CONNECT = True